@@ -0,0 +1,198 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+
+# HTML hashes of the seasons scraped by previous runs, used to skip unchanged seasons
+CACHE_FILE = 'Preprocessing/.scrape_cache.json'
+
+
+def html_path(season):
+    return f'Database/{season}/{season}.html'
+
+
+def output_path(season):
+    return f'match_data_with_dates_{season}.json'
+
+
+def available_seasons():
+    """Every season with a downloaded odds page, in chronological order."""
+    return sorted(os.path.basename(os.path.dirname(path)) for path in glob.glob('Database/*/*.html'))
+
+
+class MatchRowParser(HTMLParser):
+    """Streaming parser that keeps only the cells of each table row that the scraper reads."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.row = None
+        self.cell = None
+        self.capture = []
+
+    def handle_starttag(self, tag, attrs):
+        classes = dict(attrs).get("class") or ""
+        if tag == "tr":
+            self.row = []
+        elif tag == "td" and self.row is not None:
+            self.cell = {"class": classes, "b": None, "time": None, "a": None}
+            self.row.append(self.cell)
+        elif self.cell is not None:
+            # Only the first <b>, time <span> and <a> of a cell are used, like find() on a parsed tree
+            if tag == "b" and self.cell["b"] is None:
+                self.start_capture("b")
+            elif tag == "span" and "time" in classes.split() and self.cell["time"] is None:
+                self.start_capture("time")
+            elif tag == "a" and self.cell["a"] is None:
+                self.start_capture("a")
+
+    def start_capture(self, field):
+        self.cell[field] = []
+        self.capture.append((field, self.cell[field]))
+
+    def handle_endtag(self, tag):
+        field = {"b": "b", "span": "time", "a": "a"}.get(tag)
+        if field is not None and self.capture and self.capture[-1][0] == field:
+            self.capture.pop()
+        elif tag == "td":
+            self.cell = None
+            self.capture = []
+        elif tag == "tr" and self.row is not None:
+            self.rows.append(self.row)
+            self.row = self.cell = None
+            self.capture = []
+
+    def handle_data(self, data):
+        for _, parts in self.capture:
+            parts.append(data)
+
+
+def cell_text(cell, field):
+    return "".join(cell[field]).strip()
+
+
+def parse_matches(html_content):
+    """Extract the match odds from an odds page, in page order."""
+    # Rows are streamed out of the page, no document tree is built
+    parser = MatchRowParser()
+    parser.feed(html_content)
+    parser.close()
+
+    # List to hold match details
+    matches = []
+
+    # Initialize date variables to capture the date for each match, and the day before for early games
+    current_date = None
+    previous_date = None
+    parsed_dates = {}
+
+    for row in parser.rows:
+        # Check if the row contains a date
+        date_cell = next((cell for cell in row if cell["class"] == "l2 borbt borl"), None)
+        if date_cell:
+            raw_date_text = cell_text(date_cell, "b")
+            # Parse and format date to YYYY-MM-DD, each date heading only once
+            if raw_date_text not in parsed_dates:
+                date = datetime.strptime(raw_date_text, "%d %B %Y")
+                parsed_dates[raw_date_text] = (date.strftime("%Y-%m-%d"), (date - timedelta(days=1)).strftime("%Y-%m-%d"))
+            current_date, previous_date = parsed_dates[raw_date_text]
+
+        # Ensure it has the correct structure with 'l2 match' class and odds columns
+        match_info = next((cell for cell in row if cell["class"] == "l2 match"), None)
+        if match_info and current_date:
+            # Extract the time
+            time = cell_text(match_info, "time")
+
+            # Adjust the date if the time is between 00:00 and 12:00
+            adjusted_date = previous_date if int(time.split(":")[0]) < 12 else current_date
+
+            # Extract the teams and replace "NY" with "New York"
+            teams_text = cell_text(match_info, "a")
+            home_team, away_team = [team.strip() for team in teams_text.split(" - ")]
+
+            if "NY " in home_team:
+                home_team = home_team.replace("NY ", "New York ")
+            if "NY " in away_team:
+                away_team = away_team.replace("NY ", "New York ")
+
+            # Find odds columns
+            odds_columns = [cell for cell in row if "r" in cell["class"].split()]
+            if len(odds_columns) >= 3:
+                home_odds = cell_text(odds_columns[0], "b")
+                draw_odds = cell_text(odds_columns[1], "b")
+                away_odds = cell_text(odds_columns[2], "b")
+
+                # Append the data
+                matches.append({
+                    "Date": adjusted_date,
+                    "Time": time,
+                    "Home Team": home_team,
+                    "Away Team": away_team,
+                    "Home Odds": float(home_odds)*0.9/1.295, # adjusted for no tie game, incl. OT and Penalty
+                    "Draw Odds": float(draw_odds)*0.9,
+                    "Away Odds": float(away_odds)*0.9/1.295 # adjusted for no tie game, incl. OT and Penalty
+                })
+
+    return matches
+
+
+def scrape_season(season):
+    """Scrape one season's odds page into its JSON file. Returns the season and the number of matches."""
+    with open(html_path(season), 'r', encoding='utf-8') as file:
+        html_content = file.read()
+
+    matches = parse_matches(html_content)
+
+    # Write the data to a JSON file
+    with open(output_path(season), 'w', encoding='utf-8') as json_file:
+        json.dump(matches, json_file, ensure_ascii=False, indent=4)
+
+    return season, len(matches)
+
+
+def html_hash(season):
+    with open(html_path(season), 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def scrape(seasons, workers=None, force=False):
+    """Scrape the given seasons in parallel, skipping seasons whose page is unchanged since the last run."""
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as file:
+            cache = json.load(file)
+    except FileNotFoundError:
+        cache = {}
+
+    hashes = {season: html_hash(season) for season in seasons}
+    todo = [
+        season for season in seasons
+        if force or cache.get(season) != hashes[season] or not os.path.exists(output_path(season))
+    ]
+    for season in seasons:
+        if season not in todo:
+            print(f"Skipping {season}, {html_path(season)} is unchanged")
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for season, count in executor.map(scrape_season, todo):
+                cache[season] = hashes[season]
+                print(f"Data has been written to {output_path(season)} ({count} matches)")
+
+    with open(CACHE_FILE, 'w', encoding='utf-8') as file:
+        json.dump(cache, file, indent=4)
+
+
+# Run from the repository root, e.g. `python Preprocessing/scrape_bet.py all` or `python Preprocessing/scrape_bet.py 24-25`
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape betting odds from the saved odds pages into JSON.")
+    parser.add_argument("seasons", nargs="+", help="seasons to scrape, e.g. 23-24 24-25, or 'all'")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, defaults to the CPU count")
+    parser.add_argument("--force", action="store_true", help="scrape seasons even if their page is unchanged")
+    args = parser.parse_args()
+
+    seasons = available_seasons() if args.seasons == ["all"] else args.seasons
+    scrape(seasons, workers=args.workers, force=args.force)
@@ -0,0 +1,89 @@
+import sys
+from create_elo import (
+    DEFAULT_RATING,
+    FACTOR,
+    K,
+    FLOOR,
+    WIN_RATE_FLOOR,
+    CEIL,
+    add_game_odds,
+    expected_win,
+    load_season,
+    pick_team,
+    update_elo,
+)
+
+
+def split_window(n_matches):
+    """
+    The window main evaluates: its test matches, with ratings frozen after its training matches.
+    """
+    return n_matches - int(0.1 * n_matches), n_matches, int(0.9 * n_matches)
+
+
+def rolling_windows(n_matches, size, start=0):
+    """
+    Consecutive windows of `size` matches from `start` to the end of the season.
+    """
+    return [(first, min(first + size, n_matches)) for first in range(start, n_matches, size)]
+
+
+def walk_forward(factor, k_factor, floor, win_rate_floor, ceil, season, windows, refit=True, data=None):
+    """
+    Backtest any number of evaluation windows in one chronological pass over the season.
+    Each match is first bet on with the current ratings, then used to update them, so every window sees the
+    ratings a live bettor would have had. Windows are (start, end) match index ranges with their own balance.
+    With refit=False a window instead bets with the ratings frozen at its start, or at its third element if it
+    has one, and split_window reproduces main exactly.
+    Returns one dict per window with its final balance, bets placed and bets won.
+    """
+    df, odds = data if data is not None else load_season(season)
+    matches = add_game_odds(df, season, odds)
+
+    windows = [(window[0], window[1], window[2] if len(window) > 2 else window[0]) for window in windows]
+    results = [{"start": start, "end": end, "balance": 100, "bets": 0, "won": 0} for start, end, _ in windows]
+    frozen = [None] * len(windows)
+
+    ratings = {team: DEFAULT_RATING for team in dict.fromkeys(df["Visitor"])}
+    columns = zip(matches["Visitor"], matches["Home"], matches["Res"], matches["HomeOdds"], matches["AwayOdds"])
+    for i, (visitor, home, result, odds_home, odds_visitor) in enumerate(columns):
+        # Predict and bet with the ratings from before this match
+        live_pick = None
+        for w, (start, end, fit_end) in enumerate(windows):
+            if not refit and i == fit_end:
+                frozen[w] = dict(ratings)
+            if not start <= i < end:
+                continue
+            if refit:
+                if live_pick is None:
+                    live_pick = pick_team(ratings[home], ratings[visitor], odds_home, odds_visitor, floor, win_rate_floor, factor)
+                pick = live_pick
+            else:
+                window_ratings = frozen[w] if frozen[w] is not None else ratings
+                pick = pick_team(window_ratings[home], window_ratings[visitor], odds_home, odds_visitor, floor, win_rate_floor, factor)
+
+            if floor < pick[0] < ceil and pick[2]:
+                window = results[w]
+                bet = window["balance"] * pick[0] / 20
+                window["balance"] -= bet
+                window["bets"] += 1
+                if (result == 1 and pick[1]) or (result == 0 and not pick[1]):
+                    window["balance"] += odds_home * bet if pick[1] else odds_visitor * bet
+                    window["won"] += 1
+
+        # Then learn from the result
+        rating_visitor, rating_home = ratings[visitor], ratings[home]
+        expected_visitor, expected_home = expected_win(rating_visitor, rating_home, factor)
+        ratings[visitor] = update_elo(rating_visitor, expected_visitor, 1 - result, k_factor)
+        ratings[home] = update_elo(rating_home, expected_home, result, k_factor)
+
+    return results
+
+
+# Walk-forward results over the second half of each season in five folds, e.g. `python backtest.py 22-23 23-24`
+if __name__ == "__main__":
+    for season in sys.argv[1:] or ["19-20", "20-21", "21-22", "22-23", "23-24"]:
+        n_matches = len(load_season(season)[0])
+        windows = rolling_windows(n_matches, -(-n_matches // 10), start=n_matches // 2)
+        for window in walk_forward(FACTOR, K, FLOOR, WIN_RATE_FLOOR, CEIL, season, windows):
+            print(season, window)
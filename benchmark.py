@@ -0,0 +1,374 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+import numpy as np
+import create_elo
+import genetic_algorithm
+from create_elo import FACTOR, K, FLOOR, WIN_RATE_FLOOR, CEIL, DEFAULT_RATING, expected_win, update_elo
+from elo_core import CompactMatches, rate_compact
+
+# Real seasons timed by the suite, and the size of one synthetic season (a full NHL regular season)
+REAL_SEASONS = ["22-23", "23-24"]
+NHL_TEAMS = 32
+NHL_GAMES = 1312
+SCALES = [1, 10, 100]
+
+# A stage fails when it takes longer than THRESHOLD times its baseline time
+THRESHOLD = 1.25
+# Relative tolerance for fast paths that reorder floating point operations
+RTOL = 1e-9
+REPEAT = 3
+# A one-off prediction from a fresh interpreter must finish within this many seconds
+COLD_START_TARGET = 0.15
+# Worker pool sizes for --workers, and how long each probe task holds its worker so every worker gets tasks
+WORKER_COUNTS = [1, 2, 4]
+PROBE_PAUSE = 0.05
+
+
+def synthetic_season(scale=1, seed=0):
+    """
+    Generate a season of scale x NHL_GAMES matches between NHL_TEAMS teams, with odds in the scraped format.
+    Every team plays at most once a day, so (date, away team) identifies a game like in the real data.
+    """
+    rng = random.Random(seed)
+    strengths = [rng.gauss(0, 0.4) for _ in range(NHL_TEAMS)]
+    teams = [f"Team {i:02d}" for i in range(NHL_TEAMS)]
+    start = date(2000, 10, 1)
+
+    matches, odds = [], []
+    day = 0
+    while len(matches) < scale * NHL_GAMES:
+        order = list(range(NHL_TEAMS))
+        rng.shuffle(order)
+        match_date = (start + timedelta(days=day)).isoformat()
+        for visitor, home in zip(order[::2], order[1::2]):
+            if len(matches) == scale * NHL_GAMES:
+                break
+            p_home = 1 / (1 + np.exp(strengths[visitor] - strengths[home] - 0.1))
+            home_wins = rng.random() < p_home
+            loser_goals = rng.randint(0, 3)
+            winner_goals = loser_goals + rng.randint(1, 3)
+            gh, gv = (winner_goals, loser_goals) if home_wins else (loser_goals, winner_goals)
+            matches.append({
+                "Date": match_date, "Visitor": teams[visitor], "Gv": gv, "Home": teams[home], "Gh": gh,
+            })
+            # Bookmaker odds with a 5% margin and some noise around the true probability
+            p_quote = min(max(p_home + rng.gauss(0, 0.05), 0.05), 0.95)
+            odds.append({
+                "Date": match_date, "Home Team": teams[home], "Away Team": teams[visitor],
+                "Home Odds": 0.95 / p_quote, "Draw Odds": 4.0, "Away Odds": 0.95 / (1 - p_quote),
+            })
+        day += 1
+
+    import pandas as pd
+
+    df = pd.DataFrame(matches)
+    df["Res"] = (df["Gh"] - df["Gv"]).apply(lambda x: (1 + x / abs(x)) / 2)
+    odds = pd.DataFrame(odds)
+    odds["Date"] = pd.to_datetime(odds["Date"])
+    return df, odds
+
+
+def reference_ratings(df, factor, k_factor):
+    """
+    The plain dict-of-names rating loop, to check process_matches and its compact fast path against.
+    """
+    ratings = {team: DEFAULT_RATING for team in df["Visitor"].unique()}
+    ratings_history = {team: [DEFAULT_RATING] for team in ratings}
+    for match in df.itertuples(index=False):
+        rating_visitor, rating_home = ratings[match.Visitor], ratings[match.Home]
+        expected_visitor, expected_home = expected_win(rating_visitor, rating_home, factor)
+        ratings[match.Visitor] = update_elo(rating_visitor, expected_visitor, 1 - match.Res, k_factor)
+        ratings[match.Home] = update_elo(rating_home, expected_home, match.Res, k_factor)
+        ratings_history[match.Visitor].append(ratings[match.Visitor])
+        ratings_history[match.Home].append(ratings[match.Home])
+    return ratings, ratings_history
+
+
+def best_time(function, repeat=REPEAT, setup=None):
+    """
+    Best wall time of `repeat` calls, with `setup` run untimed before each call. Returns (seconds, result).
+    """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def population(size, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "factor": rng.uniform(*genetic_algorithm.FACTOR_RANGE),
+        "k": rng.randint(*genetic_algorithm.K_RANGE),
+        "floor": rng.uniform(*genetic_algorithm.FLOOR_RANGE),
+        "win_rate_floor": rng.uniform(*genetic_algorithm.WIN_RATE_FLOOR_RANGE),
+        "ceil": rng.uniform(*genetic_algorithm.CEIL_RANGE),
+    } for _ in range(size)]
+
+
+def check_dataset(name, data, individuals):
+    """
+    Compare every fast path against the reference create_elo functions on one dataset.
+    Returns a list of mismatch descriptions, empty when everything agrees.
+    """
+    failures = []
+    df, odds = data
+    train_df, test_df = create_elo.split_matches(df)
+    factors, k_factors = [ind["factor"] for ind in individuals], [ind["k"] for ind in individuals]
+
+    for factor, k_factor in zip(factors, k_factors):
+        if create_elo.process_matches(train_df, factor, k_factor) != reference_ratings(train_df, factor, k_factor):
+            failures.append(f"{name}: process_matches differs from the reference loop for {factor}, {k_factor}")
+
+    teams, batch = create_elo.process_matches_batch(train_df, factors, k_factors)
+    for row, factor, k_factor in zip(batch.tolist(), factors, k_factors):
+        reference, _ = create_elo.process_matches(train_df, factor, k_factor)
+        if dict(zip(teams, row)) != reference:
+            failures.append(f"{name}: process_matches_batch differs from process_matches for {factor}, {k_factor}")
+
+    test_df = create_elo.add_game_odds(test_df, name, odds)
+    tables, references = [], []
+    for ind in individuals:
+        ratings, _ = create_elo.process_matches(train_df, ind["factor"], ind["k"])
+        thresholds = (ind["floor"], ind["win_rate_floor"], ind["ceil"])
+        reference = create_elo.simulate_betting(ratings, test_df, ind["factor"], *thresholds)
+        table = create_elo.betting_table(ratings, test_df, ind["factor"])
+        if create_elo.simulate_table(table, *thresholds) != reference:
+            failures.append(f"{name}: simulate_table differs from simulate_betting for {ind}")
+        tables.append(table)
+        references.append(reference)
+
+    thresholds = [[ind[gene] for ind in individuals] for gene in ("floor", "win_rate_floor", "ceil")]
+    for log_space in (False, True):
+        final, _ = create_elo.simulate_trajectory(create_elo.stack_tables(tables), *thresholds, log_space=log_space)
+        if not np.allclose(final, references, rtol=RTOL, atol=0):
+            failures.append(f"{name}: simulate_trajectory (log_space={log_space}) differs from simulate_betting")
+
+    # A single block spanning every test match resamples the original sequence
+    for ind, table, reference in zip(individuals, tables, references):
+        final, _ = create_elo.bootstrap_balances(table, ind["floor"], ind["win_rate_floor"], ind["ceil"], samples=2,
+                                                 block=len(table["return"]))
+        if not np.allclose(final, reference, rtol=RTOL, atol=0):
+            failures.append(f"{name}: bootstrap_balances of the original order differs from simulate_betting")
+
+    create_elo.clear_caches()
+    balances = [create_elo.main(ind["factor"], ind["k"], ind["floor"], ind["win_rate_floor"], ind["ceil"], name, data)
+                for ind in individuals]
+    # Once rating pair by pair and once through process_matches_batch
+    for batch_min_pairs in (len(individuals) + 1, 1):
+        create_elo.clear_caches()
+        batch_balances = create_elo.main_batch(
+            factors, k_factors, [ind["floor"] for ind in individuals], [ind["win_rate_floor"] for ind in individuals],
+            [ind["ceil"] for ind in individuals], name, data, batch_min_pairs
+        )
+        if balances != batch_balances:
+            failures.append(f"{name}: main_batch (batch_min_pairs={batch_min_pairs}) differs from main")
+    policy_balances = [
+        create_elo.main_policies(ind["factor"], ind["k"], ind["floor"], ind["win_rate_floor"], ind["ceil"], name,
+                                 data=data)["return"]
+        for ind in individuals
+    ]
+    if balances != policy_balances:
+        failures.append(f"{name}: main_policies with return_stake differs from main")
+    return failures
+
+
+def time_dataset(name, data, individuals, repeat):
+    """
+    Time each stage of the pipeline on one dataset, from cold caches.
+    """
+    df, odds = data
+    train_df, test_df = create_elo.split_matches(df)
+    factors, k_factors = [ind["factor"] for ind in individuals], [ind["k"] for ind in individuals]
+    timings = {}
+
+    timings["reference_ratings"], _ = best_time(lambda: reference_ratings(train_df, FACTOR, K), repeat)
+    timings["process_matches"], _ = best_time(lambda: create_elo.process_matches(train_df, FACTOR, K), repeat)
+    compact = CompactMatches(train_df)
+    timings["rate_compact"], _ = best_time(lambda: rate_compact(compact, FACTOR, K), repeat)
+    timings["process_matches_batch"], _ = best_time(
+        lambda: create_elo.process_matches_batch(train_df, factors, k_factors), repeat
+    )
+    timings["add_game_odds"], test_df = best_time(lambda: create_elo.add_game_odds(test_df, name, odds), repeat)
+    ratings, _ = create_elo.process_matches(train_df, FACTOR, K)
+    timings["simulate_betting"], _ = best_time(
+        lambda: create_elo.simulate_betting(ratings, test_df, FACTOR, FLOOR, WIN_RATE_FLOOR, CEIL), repeat
+    )
+    table = create_elo.betting_table(ratings, test_df, FACTOR)
+    timings["simulate_table"], _ = best_time(lambda: create_elo.simulate_table(table, FLOOR, WIN_RATE_FLOOR, CEIL), repeat)
+    stacked = create_elo.stack_tables([table] * len(individuals))
+    thresholds = [[ind[gene] for ind in individuals] for gene in ("floor", "win_rate_floor", "ceil")]
+    timings["simulate_trajectory"], _ = best_time(lambda: create_elo.simulate_trajectory(stacked, *thresholds), repeat)
+    timings["main"], _ = best_time(
+        lambda: create_elo.main(FACTOR, K, FLOOR, WIN_RATE_FLOOR, CEIL, name, data), repeat, create_elo.clear_caches
+    )
+    timings["main_batch"], _ = best_time(
+        lambda: create_elo.main_batch(
+            factors, k_factors, [ind["floor"] for ind in individuals], [ind["win_rate_floor"] for ind in individuals],
+            [ind["ceil"] for ind in individuals], name, data
+        ),
+        repeat,
+        create_elo.clear_caches,
+    )
+    return {f"{name}/{stage}": seconds for stage, seconds in timings.items()}
+
+
+def cold_start(repeat=REPEAT):
+    """
+    Wall time of a one-off `python predict_match.py`, from process start to the printed recommendation.
+    """
+    command = [sys.executable, "predict_match.py"]
+    seconds, _ = best_time(lambda: subprocess.run(command, check=True, capture_output=True), repeat)
+    return seconds
+
+
+def worker_memory():
+    """
+    Resident and proportional set size of this process in kB. Pages of a shared memory map are split between the
+    processes mapping them in the proportional size. Linux only, elsewhere empty.
+    """
+    try:
+        with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as file:
+            fields = dict(line.split(":", 1) for line in file if ":" in line and not line.startswith(" "))
+    except OSError:
+        return {}
+    return {name.lower() + "_kb": int(fields[name].split()[0]) for name in ("Rss", "Pss") if name in fields}
+
+
+def worker_probe(task):
+    """
+    Evaluate one GA task in a pool worker. Returns the worker's pid, when the evaluation finished, its memory and
+    whether it imported pandas. pandas is only imported where it is used, so unpickling this probe does not load it.
+    """
+    genetic_algorithm.evaluate_task(task)
+    finished = time.time()
+    memory = worker_memory()
+    time.sleep(PROBE_PAUSE)
+    return os.getpid(), finished, memory, "pandas" in sys.modules
+
+
+def worker_scaling(counts=WORKER_COUNTS, start_method="spawn"):
+    """
+    For each pool size, with workers mapping the shared season store and with each worker loading the seasons
+    itself: the time from starting the pool until every worker has finished its first evaluation, how many workers
+    imported pandas and the mean memory per worker.
+    """
+    individuals = population(4 * max(counts))
+    results = {}
+    for shared in (True, False):
+        for count in counts:
+            tasks = [(ind, genetic_algorithm.SEASONS[i % len(genetic_algorithm.SEASONS)], i, "balance")
+                     for i, ind in enumerate(individuals[:4 * count])]
+            start = time.time()
+            with genetic_algorithm.start_workers(count, start_method, shared) as executor:
+                probes = list(executor.map(worker_probe, tasks))
+            first = {}
+            for pid, finished, memory, pandas in probes:
+                first.setdefault(pid, (finished, memory, pandas))
+            memories = [memory for _, memory, _ in first.values()]
+            results[f"{'shared' if shared else 'unshared'}/{count}"] = {
+                "workers_seen": len(first),
+                "first_evaluation_seconds": max(finished for finished, _, _ in first.values()) - start,
+                "workers_with_pandas": sum(pandas for _, _, pandas in first.values()),
+                **{key: sum(memory.get(key, 0) for memory in memories) / len(memories) for key in ("rss_kb", "pss_kb")},
+            }
+    return results
+
+
+def run(scales=SCALES, repeat=REPEAT, check=True, racing=False):
+    """
+    Run the whole suite. Returns the stage timings in seconds and a list of failed checks.
+    With racing=True it also checks that racing finds the plain GA's best solution, which runs the GA twice per
+    benchmark seed.
+    """
+    individuals = population(genetic_algorithm.POPULATION_SIZE)
+    timings, failures = {}, []
+
+    datasets = [(season, create_elo.load_season(season)) for season in REAL_SEASONS]
+    datasets += [(f"synthetic-{scale}x", synthetic_season(scale, seed=scale)) for scale in scales]
+    for name, data in datasets:
+        if check:
+            failures += check_dataset(name, data, individuals[:4])
+        timings.update(time_dataset(name, data, individuals, repeat))
+        print(f"{name}: {len(data[0])} matches timed", file=sys.stderr)
+
+    # One GA generation on the real seasons, from cold caches and with a warm season cache
+    timings["ga/generation"], _ = best_time(
+        lambda: genetic_algorithm.evaluate_population(individuals), repeat, create_elo.clear_caches
+    )
+    if check and racing:
+        # Racing only drops individuals that cannot win a tournament, so it must find the same best solution
+        for row in genetic_algorithm.racing_report():
+            if not row["same_best"]:
+                failures.append(f"racing changed the best solution for seed {row['seed']}: "
+                                f"{row['racing_fitness']} instead of {row['plain_fitness']}")
+    timings["cold_start/predict_match"] = cold_start(repeat)
+    if timings["cold_start/predict_match"] > COLD_START_TARGET:
+        failures.append(f"predict_match cold start took {timings['cold_start/predict_match']:.3f}s, "
+                        f"target {COLD_START_TARGET}s")
+    return timings, failures
+
+
+def regressions(timings, baseline, threshold=THRESHOLD):
+    """
+    Stages that took more than `threshold` times their baseline time.
+    """
+    return {
+        stage: (seconds, baseline[stage])
+        for stage, seconds in timings.items()
+        if stage in baseline and seconds > threshold * baseline[stage]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the rating, odds, betting and GA stages and check fast paths.")
+    parser.add_argument("--scales", type=int, nargs="*", default=SCALES, help="synthetic season sizes, in NHL seasons")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timed runs per stage, the best one counts")
+    parser.add_argument("--output", default="benchmark_results.json", help="file to record the results in")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown factor over the baseline")
+    parser.add_argument("--no-check", action="store_true", help="skip comparing fast paths with the reference")
+    parser.add_argument("--workers", type=int, nargs="*", help="also measure GA worker pools of these sizes")
+    parser.add_argument("--racing", action="store_true", help="also check racing against the plain GA on every seed")
+    args = parser.parse_args()
+
+    timings, failures = run(args.scales, args.repeat, not args.no_check, args.racing)
+    workers = worker_scaling(args.workers) if args.workers else {}
+    import pandas as pd
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "timings": timings,
+            "workers": workers,
+        }, file, indent=4)
+
+    for stage, seconds in timings.items():
+        print(f"{stage:45s} {seconds * 1000:10.2f} ms")
+    for pool, measurement in workers.items():
+        print(f"workers/{pool:37s} {measurement['first_evaluation_seconds'] * 1000:10.2f} ms to first evaluation, "
+              f"{measurement['workers_seen']} workers, {measurement.get('pss_kb', 0) / 1024:.1f} MB proportional, "
+              f"{measurement.get('rss_kb', 0) / 1024:.1f} MB resident per worker")
+
+    slow = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            slow = regressions(timings, json.load(file)["timings"], args.threshold)
+    for stage, (seconds, baseline) in slow.items():
+        print(f"REGRESSION {stage}: {seconds * 1000:.2f} ms, baseline {baseline * 1000:.2f} ms")
+    for failure in failures:
+        print(f"FAILED {failure}")
+    sys.exit(1 if slow or failures else 0)
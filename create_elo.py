@@ -1,89 +1,202 @@
-import pandas as pd
+import numpy as np
+import hashlib
 import math
+import json
+import os
+from collections import OrderedDict
+import instrumentation
+import season_store
+import staking
+from elo_core import (
+    DEFAULT_RATING,
+    FACTOR,
+    K,
+    FLOOR,
+    WIN_RATE_FLOOR,
+    CEIL,
+    expected_win,
+    update_elo,
+    CompactMatches,
+    rate_compact,
+    process_matches,
+    pick_team,
+)
+
+# pandas is imported where the CSV and JSON files are parsed, so GA workers rating seasons from the compiled store
+# (season_arrays, main_arrays) never load it
+
+# Parsed season files, keyed by path: (mtime, size), content hash, parsed data
+_FILE_CACHE = {}
+
+# Trained ratings and betting tables, keyed by (season, factor, k_factor), least recently used first
+RATING_CACHE_SIZE = 4096
+_RATING_CACHE = OrderedDict()
+
+# main_batch rates the uncached (factor, K) pairs of a season with process_matches_batch from this many pairs on,
+# below it rating each pair with rate_compact is faster
+BATCH_MIN_PAIRS = 64
+
+# Training matches with interned team names, keyed by season: matches, CompactMatches
+_TRAIN_CACHE = {}
+
+# Test matches joined with their odds, keyed by season: matches, odds, test dataframe, betting_columns inputs
+_TEST_CACHE = {}
+
+# Resamples of the test matches drawn by bootstrap_balances, and the length of the blocks they are drawn in
+BOOTSTRAP_SAMPLES = 2000
+BOOTSTRAP_BLOCK = 10
+
+
+def process_matches_batch(df, factors, k_factors):
+    """
+    Calculate ELO ratings for many (factor, K) pairs in one pass over the matches, with every match updating all
+    parameter sets at once. The exponentials use math.exp and the rest is the same IEEE arithmetic as
+    process_matches, so every set's ratings match process_matches bit-for-bit.
+    Returns the team names and a (parameter sets x teams) array of final ratings.
+    `df` may also be CompactMatches built from the matches.
+    """
+    matches = df if isinstance(df, CompactMatches) else CompactMatches(df)
+    factors = np.asarray(factors, dtype=float)
+    k_factors = np.asarray(k_factors, dtype=float)
+    n_sets = len(factors)
+    # One contiguous row of parameter sets per team
+    ratings = np.full((len(matches.teams), n_sets), float(DEFAULT_RATING))
+
+    exp = math.exp
+    for visitor, home, result in zip(matches.visitors, matches.homes, matches.results):
+        rating_visitor, rating_home = ratings[visitor], ratings[home]
+        exp_visitor = np.fromiter(map(exp, (rating_visitor / factors).tolist()), float, n_sets)
+        exp_home = np.fromiter(map(exp, (rating_home / factors).tolist()), float, n_sets)
+        total = exp_visitor + exp_home
+        rating_visitor += k_factors * ((1 - result) - exp_visitor / total)
+        rating_home += k_factors * (result - exp_home / total)
 
-# Constants for ELO calculation
-DEFAULT_RATING = 1000
-FACTOR = 348.52756272674264
-K = 33
-FLOOR = 0.4756190754648416
-WIN_RATE_FLOOR = 0.2946325964931914
-CEIL = 0.9506928437169432
+    return matches.teams, ratings.T
 
 
-def expected_win(rating_a, rating_b, factor):
+def test_matches(ratings, df, factor):
     """
-    Calculate the expected win probability for two teams based on their ELO ratings.
+    Test the model by calculating the difference between actual and expected outcomes.
     """
-    exp_a = math.exp(rating_a / factor)
-    exp_b = math.exp(rating_b / factor)
-    expected_a = exp_a / (exp_a + exp_b)
-    expected_b = exp_b / (exp_a + exp_b)
-    return expected_a, expected_b
+    test_results = []
+    for match in df.itertuples(index=False):
+        visitor, home, result = match.Visitor, match.Home, match.Res
+        expected_home = expected_win(ratings[home], ratings[visitor], factor)[0]
+        test_results.append(result - expected_home)
+    return test_results
+
+
+def _file_hash(path):
+    with open(path, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
 
 
-def update_elo(rating, expected, actual, k_factor):
+def _load_cached(path, parse):
     """
-    Update the ELO rating for a team after a match.
+    Parse a file once per process and reuse the result until the file's mtime or content changes.
     """
-    return rating + k_factor * (actual - expected)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _FILE_CACHE.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[2]
+
+    # The mtime changed, but the contents may not have (e.g. the file was touched or re-scraped)
+    digest = _file_hash(path)
+    if cached is not None and cached[1] == digest:
+        _FILE_CACHE[path] = (signature, digest, cached[2])
+        return cached[2]
+
+    data = parse(path)
+    _FILE_CACHE[path] = (signature, digest, data)
+    return data
+
+
+def _parse_matches(file_path, season):
+    import pandas as pd
+
+    with instrumentation.stage("read_csv", season):
+        df = pd.read_csv(file_path)
+    # Scheduled games without a score yet are not part of the results, as in elo_core.read_matches
+    if df["Gv"].isna().any() or df["Gh"].isna().any():
+        df = df.dropna(subset=["Gv", "Gh"]).reset_index(drop=True)
+        df[["Gv", "Gh"]] = df[["Gv", "Gh"]].astype(int)
+    with instrumentation.stage("preprocess_res", season):
+        df["Res"] = (df["Gh"] - df["Gv"]).apply(lambda x: (1 + x / abs(x)) / 2)
+    return df
+
 
+def _parse_odds(file_path, season):
+    import pandas as pd
 
-def process_matches(df, factor, k_factor):
+    with instrumentation.stage("read_json", season):
+        return pd.read_json(file_path)
+
+
+def clear_caches():
     """
-    Calculate ELO ratings for each team based on match results.
+    Forget all parsed seasons, trained ratings and betting tables, e.g. to time a cold run.
     """
-    # Initialize ratings and rating history for each team
-    ratings = {team: DEFAULT_RATING for team in df["Visitor"].unique()}
-    ratings_history = {team: [DEFAULT_RATING] for team in df["Visitor"].unique()}
+    _FILE_CACHE.clear()
+    _RATING_CACHE.clear()
+    _TRAIN_CACHE.clear()
+    _TEST_CACHE.clear()
 
-    # Iterate over each match to update ELO ratings
-    for match in df.itertuples(index=False):
-        visitor, home, result = match.Visitor, match.Home, match.Res
-        rating_visitor, rating_home = ratings[visitor], ratings[home]
 
-        # Calculate expected win probabilities
-        expected_visitor, expected_home = expected_win(rating_visitor, rating_home, factor)
+def load_matches(season):
+    """
+    Load and preprocess the scored matches of a season. The returned dataframe is shared, do not modify it in place.
+    """
+    return _load_cached(f"Database/{season}/{season}.csv", lambda path: _parse_matches(path, season))
+
 
-        # Update ELO ratings based on match result
-        ratings[visitor] = update_elo(rating_visitor, expected_visitor, 1 - result, k_factor)
-        ratings[home] = update_elo(rating_home, expected_home, result, k_factor)
+def load_odds(season):
+    """
+    Load the scraped game odds for a season. The returned dataframe is shared, do not modify it in place.
+    """
+    return _load_cached(f"match_data_with_dates_{season}.json", lambda path: _parse_odds(path, season))
 
-        # Save updated ratings to history
-        ratings_history[visitor].append(ratings[visitor])
-        ratings_history[home].append(ratings[home])
 
-    return ratings, ratings_history
+def load_season(season):
+    """
+    Load the match results and game odds for a season, to be passed to main as preloaded data.
+    Reads the compiled season store when it is up to date, otherwise falls back to the CSV and JSON files.
+    """
+    with instrumentation.stage("load_season", season):
+        store = season_store.open_store()
+        if store is not None and store.is_fresh(season):
+            return store.frames(season)
+        return load_matches(season), load_odds(season)
 
 
-def test_matches(ratings, df, factor):
+def odds_index(odds):
     """
-    Test the model by calculating the difference between actual and expected outcomes.
+    Index game odds by (date, away team), keeping the first listing of each game.
     """
-    test_results = []
-    for match in df.itertuples(index=False):
-        visitor, home, result = match.Visitor, match.Home, match.Res
-        expected_home = expected_win(ratings[home], ratings[visitor], factor)[0]
-        test_results.append(result - expected_home)
-    return test_results
+    import pandas as pd
 
+    index = {}
+    keys = zip(pd.to_datetime(odds["Date"]), odds["Away Team"])
+    values = zip(odds["Home Odds"], odds["Draw Odds"], odds["Away Odds"])
+    for key, value in zip(keys, values):
+        index.setdefault(key, value)
+    return index
 
-def add_game_odds(df, season):
+
+def add_game_odds(df, season, odds=None):
     """
     Add game odds to the dataframe from an external file.
+    The number of matches without odds is stored in df.attrs["missing_odds"].
     """
-    odds = pd.read_json(f"match_data_with_dates_{season}.json")
-    odds_list = []
+    import pandas as pd
 
-    for match in df.itertuples(index=False):
-        date, visitor = match.Date, match.Visitor
-        match_odds = odds[(odds["Date"] == date) & (odds["Away Team"] == visitor)]
+    if odds is None:
+        odds = load_odds(season)
+    index = odds_index(odds)
 
-        if match_odds.empty:
-            odds_list.append((None, None, None))
-        else:
-            odds_list.append(
-                (match_odds["Home Odds"].iloc[0], match_odds["Draw Odds"].iloc[0], match_odds["Away Odds"].iloc[0])
-            )
+    missing = (None, None, None)
+    keys = zip(pd.to_datetime(df["Date"]), df["Visitor"])
+    odds_list = [index.get(key, missing) for key in keys]
 
     # Add new columns for home, draw, and away odds
     df = df.assign(
@@ -91,45 +204,23 @@ def add_game_odds(df, season):
         DrawOdds=[odd[1] for odd in odds_list],
         AwayOdds=[odd[2] for odd in odds_list],
     )
+    df.attrs["missing_odds"] = sum(odd is missing for odd in odds_list)
     return df
 
 
-def pick_team(rating_home, rating_visitor, odds_home, odds_visitor, floor, win_rate_floor, factor):
+def split_matches(df):
     """
-    Determine which team to bet on based on expected returns and win probabilities.
+    Split the season into the first 90% of matches for training and the last 10% for testing.
     """
-    expected_home, expected_visitor = expected_win(rating_home, rating_visitor, factor)
-    return_home = expected_home * odds_home - 1
-    return_visitor = expected_visitor * odds_visitor - 1
-
-    flag_home = return_home > return_visitor
-    flag_bet = (flag_home and expected_home > win_rate_floor) or (
-        not flag_home and expected_visitor > win_rate_floor
-    )
-
-    return max(return_home, return_visitor), flag_home, flag_bet
-
-
-def main(factor, k_factor, floor, win_rate_floor, ceil, season):
-    """
-    Run the ELO model for a given season and parameters, simulating betting results.
-    """
-    # Load and preprocess match data
-    file_path = f"Database/{season}/{season}.csv"
-    df = pd.read_csv(file_path)
-    df["Res"] = (df["Gh"] - df["Gv"]).apply(lambda x: (1 + x / abs(x)) / 2)
-
-    # Split data into training and testing sets
     train_df = df.head(int(0.9 * len(df)))
     test_df = df.tail(int(0.1 * len(df)))
+    return train_df, test_df
 
-    # Process training matches to calculate ratings
-    ratings, _ = process_matches(train_df, factor, k_factor)
-
-    # Add game odds to test matches
-    test_df = add_game_odds(test_df, season)
 
-    # Simulate betting
+def simulate_betting(ratings, test_df, factor, floor, win_rate_floor, ceil):
+    """
+    Simulate betting on the test matches with fixed ratings, returning the final balance.
+    """
     balance = 100
     for match in test_df.itertuples(index=False):
         pick = pick_team(
@@ -150,7 +241,343 @@ def main(factor, k_factor, floor, win_rate_floor, ceil, season):
     return balance
 
 
+def betting_table(ratings, test_df, factor):
+    """
+    Precompute pick_team for every test match: the best expected return, the side it backs, that side's
+    win probability, whether the bet would win and the odds it pays. Only the thresholds are left to apply.
+    """
+    return betting_columns(
+        ratings, test_df["Home"].tolist(), test_df["Visitor"].tolist(), test_df["HomeOdds"].to_numpy(dtype=float),
+        test_df["AwayOdds"].to_numpy(dtype=float), test_df["Res"].to_numpy(dtype=float), factor
+    )
+
+
+def betting_columns(ratings, homes, visitors, odds_home, odds_visitor, result, factor):
+    """
+    betting_table from the test match columns, with teams as keys of `ratings` (names or interned IDs).
+    Odds are NaN for matches without odds, which are never bet on.
+    """
+    expected = [expected_win(ratings[home], ratings[visitor], factor) for home, visitor in zip(homes, visitors)]
+    expected_home = np.array([pair[0] for pair in expected])
+    expected_visitor = np.array([pair[1] for pair in expected])
+
+    return_home = expected_home * odds_home - 1
+    return_visitor = expected_visitor * odds_visitor - 1
+    flag_home = return_home > return_visitor
+    return {
+        "return": np.where(return_visitor > return_home, return_visitor, return_home),
+        "win_prob": np.where(flag_home, expected_home, expected_visitor),
+        "won": np.where(flag_home, result == 1, result == 0),
+        "odds": np.where(flag_home, odds_home, odds_visitor),
+    }
+
+
+def simulate_table(table, floor, win_rate_floor, ceil):
+    """
+    Simulate betting from a precomputed betting table, giving the same balance as simulate_betting.
+    """
+    returns = table["return"]
+    mask = (floor < returns) & (returns < ceil) & (table["win_prob"] > win_rate_floor)
+
+    balance = 100
+    for expected_return, won, odds in zip(returns[mask].tolist(), table["won"][mask].tolist(), table["odds"][mask].tolist()):
+        bet = balance * expected_return / 20
+        balance -= bet
+        if won:
+            balance += odds * bet
+    return balance
+
+
+def stack_tables(tables):
+    """
+    Stack betting tables of the same test matches (e.g. one per parameter set) into (parameter sets x matches) arrays.
+    """
+    return {column: np.stack([table[column] for table in tables]) for column in tables[0]}
+
+
+def bet_multipliers(table, floor, win_rate_floor, ceil):
+    """
+    The factor each test match multiplies the balance by: 1 + (won * odds - 1) * return / 20 for a bet, 1 otherwise.
+    The table may be stacked with stack_tables and the thresholds given as one value per row.
+    """
+    returns = table["return"]
+    floor, win_rate_floor, ceil = (np.asarray(value, dtype=float)[..., None] for value in (floor, win_rate_floor, ceil))
+    mask = (floor < returns) & (returns < ceil) & (table["win_prob"] > win_rate_floor)
+    return np.where(mask, 1 + (table["won"] * table["odds"] - 1) * returns / 20, 1.0)
+
+
+def simulate_trajectory(table, floor, win_rate_floor, ceil, log_space=False):
+    """
+    Vectorized simulate_table: every bet multiplies the balance by 1 + (won * odds - 1) * return / 20,
+    so the balance after each match is a cumulative product over the test matches.
+    The table may be stacked with stack_tables and the thresholds given as one value per row.
+    Returns the final balances and the balance after every match. In log space the product is a sum of logs,
+    which avoids underflow on very long sequences. Agrees with simulate_table up to rounding.
+    """
+    multipliers = bet_multipliers(table, floor, win_rate_floor, ceil)
+    if log_space:
+        trajectory = 100 * np.exp(np.cumsum(np.log(multipliers), axis=-1))
+    else:
+        trajectory = 100 * np.cumprod(multipliers, axis=-1)
+    final = trajectory[..., -1] if trajectory.shape[-1] else np.full(trajectory.shape[:-1], 100.0)
+    return final, trajectory
+
+
+def bootstrap_indices(n_matches, samples=BOOTSTRAP_SAMPLES, block=BOOTSTRAP_BLOCK, seed=0):
+    """
+    Match orders for a moving block bootstrap: each row strings together randomly placed runs of `block`
+    consecutive test matches, cut to n_matches. A block of 1 resamples single matches with replacement.
+    """
+    rng = np.random.default_rng(seed)
+    block = max(1, min(block, n_matches))
+    starts = rng.integers(0, n_matches - block + 1, size=(samples, -(-n_matches // block)))
+    return (starts[..., None] + np.arange(block)).reshape(samples, -1)[:, :n_matches]
+
+
+def bootstrap_balances(table, floor, win_rate_floor, ceil, samples=BOOTSTRAP_SAMPLES, block=BOOTSTRAP_BLOCK, seed=0):
+    """
+    Simulate betting on `samples` resampled test sequences at once, from one betting table.
+    Every resample is a row of log multipliers, so the balances are one cumulative sum over a (samples x matches)
+    array. Returns the final balance and the maximum drawdown (largest fall from a running peak, as a fraction)
+    of every resample.
+    """
+    log_multipliers = np.log(bet_multipliers(table, floor, win_rate_floor, ceil))
+    if not len(log_multipliers):
+        return np.full(samples, 100.0), np.zeros(samples)
+    paths = np.cumsum(log_multipliers[bootstrap_indices(len(log_multipliers), samples, block, seed)], axis=1)
+    # Peaks include the starting balance, which is log 0 relative to it
+    peaks = np.maximum.accumulate(np.maximum(paths, 0), axis=1)
+    drawdown = 1 - np.exp(np.min(paths - peaks, axis=1))
+    return 100 * np.exp(paths[:, -1]), drawdown
+
+
+def bootstrap(factor, k_factor, floor, win_rate_floor, ceil, season, samples=BOOTSTRAP_SAMPLES, block=BOOTSTRAP_BLOCK,
+              seed=0, data=None):
+    """
+    Distribution of main's final balance over resampled test matches, for the cost of one main call.
+    Returns the final balances and maximum drawdowns of every resample, as from bootstrap_balances.
+    """
+    data = data if data is not None else load_season(season)
+    table = _rating_stage(season, factor, k_factor, data)
+    with instrumentation.stage("bootstrap", season):
+        return bootstrap_balances(table, floor, win_rate_floor, ceil, samples, block, seed)
+
+
+def _record_betting(season, table, floor, win_rate_floor, ceil):
+    """
+    Count where the test matches of one simulation went: no odds, filtered by a threshold, or bet on.
+    """
+    returns, win_prob = table["return"], table["win_prob"]
+    no_odds = np.isnan(returns)
+    below_floor = ~no_odds & ~(floor < returns)
+    above_ceil = ~no_odds & ~below_floor & ~(returns < ceil)
+    below_win_rate = ~no_odds & ~below_floor & ~above_ceil & ~(win_prob > win_rate_floor)
+    placed = ~(no_odds | below_floor | above_ceil | below_win_rate)
+    instrumentation.count("simulations", 1, season)
+    instrumentation.count("skipped_no_odds", no_odds.sum(), season)
+    instrumentation.count("filtered_floor", below_floor.sum(), season)
+    instrumentation.count("filtered_ceil", above_ceil.sum(), season)
+    instrumentation.count("filtered_win_rate_floor", below_win_rate.sum(), season)
+    instrumentation.count("bets_placed", placed.sum(), season)
+    instrumentation.count("bets_won", (placed & table["won"]).sum(), season)
+
+
+def _train_stage(season, data):
+    """
+    Return the training split of the season as CompactMatches, reusing it while the season data is unchanged.
+    """
+    df = data[0]
+    cached = _TRAIN_CACHE.get(season)
+    if cached is None or cached[0] is not df:
+        cached = (df, CompactMatches(split_matches(df)[0]))
+        _TRAIN_CACHE[season] = cached
+    return cached[1]
+
+
+def _test_stage(season, data):
+    """
+    Return the test split of the season joined with its odds, reusing it while the season data is unchanged.
+    """
+    df, odds = data
+    cached = _TEST_CACHE.get(season)
+    if cached is None or cached[0] is not df or cached[1] is not odds:
+        with instrumentation.stage("odds_join", season):
+            test_df = add_game_odds(split_matches(df)[1], season, odds)
+        instrumentation.count("odds_missing", test_df.attrs["missing_odds"], season)
+        columns = (
+            test_df["Home"].tolist(), test_df["Visitor"].tolist(), test_df["HomeOdds"].to_numpy(dtype=float),
+            test_df["AwayOdds"].to_numpy(dtype=float), test_df["Res"].to_numpy(dtype=float),
+        )
+        cached = (df, odds, test_df, columns)
+        _TEST_CACHE[season] = cached
+    return cached[2]
+
+
+def _test_columns(season, data):
+    """
+    The test match columns betting_columns takes, converted from the dataframe once per season.
+    """
+    _test_stage(season, data)
+    return _TEST_CACHE[season][3]
+
+
+def missing_odds(season, data=None):
+    """
+    Number of the season's test matches without scraped odds. main never bets on them.
+    """
+    data = data if data is not None else load_season(season)
+    return _test_stage(season, data).attrs["missing_odds"]
+
+
+def _cached_table(key, data):
+    cached = _RATING_CACHE.get(key)
+    if cached is None or cached[0] is not data[0] or cached[1] is not data[1]:
+        return None
+    _RATING_CACHE.move_to_end(key)
+    return cached[2]
+
+
+def _store_table(key, data, table):
+    _RATING_CACHE[key] = (data[0], data[1], table)
+    if len(_RATING_CACHE) > RATING_CACHE_SIZE:
+        _RATING_CACHE.popitem(last=False)
+
+
+def _rating_stage(season, factor, k_factor, data):
+    """
+    Return the betting table for (season, factor, k_factor), training the ratings only if they are not cached.
+    """
+    key = (season, factor, k_factor)
+    table = _cached_table(key, data)
+    if table is not None:
+        instrumentation.count("rating_cache_hits", 1, season)
+        return table
+
+    instrumentation.count("rating_cache_misses", 1, season)
+    with instrumentation.stage("process_matches", season):
+        ratings, _ = process_matches(_train_stage(season, data), factor, k_factor, history=False)
+    return _betting_stage(season, factor, k_factor, ratings, data)
+
+
+def _betting_stage(season, factor, k_factor, ratings, data):
+    """
+    Build and cache the betting table for (season, factor, k_factor) from trained ratings keyed by team name.
+    """
+    columns = _test_columns(season, data)
+    with instrumentation.stage("betting_table", season):
+        table = betting_columns(ratings, *columns, factor)
+    _store_table((season, factor, k_factor), data, table)
+    return table
+
+
+def main(factor, k_factor, floor, win_rate_floor, ceil, season, data=None):
+    """
+    Run the ELO model for a given season and parameters, simulating betting results.
+    `data` is an optional (matches, odds) tuple from load_season, otherwise the season is loaded from the cache.
+    The ratings only depend on (season, factor, k_factor) and are reused when just the thresholds change.
+    """
+    # Load and preprocess match data
+    data = data if data is not None else load_season(season)
+
+    # Train ratings on the first 90% of the season and precompute the bets on the rest
+    table = _rating_stage(season, factor, k_factor, data)
+
+    # Simulate betting
+    if instrumentation.ENABLED:
+        _record_betting(season, table, floor, win_rate_floor, ceil)
+    with instrumentation.stage("betting", season):
+        return simulate_table(table, floor, win_rate_floor, ceil)
+
+
+def main_batch(factors, k_factors, floors, win_rate_floors, ceils, season, data=None, batch_min_pairs=BATCH_MIN_PAIRS):
+    """
+    Run main for many parameter sets on one season, loading the season and its splits once.
+    With at least `batch_min_pairs` uncached (factor, K) pairs they are rated together by process_matches_batch,
+    otherwise one by one with rate_compact. Both give exactly main's ratings.
+    Returns one balance per parameter set, equal to what main returns for it.
+    """
+    data = data if data is not None else load_season(season)
+
+    tables = {}
+    pairs = list(dict.fromkeys(
+        pair for pair in zip(factors, k_factors) if _cached_table((season, *pair), data) is None
+    ))
+    if len(pairs) >= batch_min_pairs:
+        instrumentation.count("rating_cache_misses", len(pairs), season)
+        with instrumentation.stage("process_matches_batch", season):
+            teams, batch = process_matches_batch(_train_stage(season, data), *zip(*pairs))
+        for (factor, k_factor), row in zip(pairs, batch.tolist()):
+            tables[factor, k_factor] = _betting_stage(season, factor, k_factor, dict(zip(teams, row)), data)
+
+    balances = []
+    for factor, k_factor, floor, win_rate_floor, ceil in zip(factors, k_factors, floors, win_rate_floors, ceils):
+        table = tables.get((factor, k_factor))
+        if table is None:
+            table = _rating_stage(season, factor, k_factor, data)
+        if instrumentation.ENABLED:
+            _record_betting(season, table, floor, win_rate_floor, ceil)
+        with instrumentation.stage("betting", season):
+            balances.append(simulate_table(table, floor, win_rate_floor, ceil))
+    return balances
+
+
+def main_policies(factor, k_factor, floor, win_rate_floor, ceil, season, policies=staking.POLICIES, data=None):
+    """
+    Run main with several staking policies at once: the bets are picked once and every policy stakes on them.
+    Returns the final balance of each policy, keyed like `policies`. staking.return_stake gives main's balance.
+    """
+    data = data if data is not None else load_season(season)
+    table = _rating_stage(season, factor, k_factor, data)
+    returns = table["return"]
+    mask = (floor < returns) & (returns < ceil) & (table["win_prob"] > win_rate_floor)
+    bets = zip(returns[mask].tolist(), table["win_prob"][mask].tolist(), table["won"][mask].tolist(),
+               table["odds"][mask].tolist())
+    with instrumentation.stage("staking", season):
+        return staking.simulate_policies(bets, policies)
+
+
+def season_arrays(arrays, n_teams):
+    """
+    Split one season's columns from the compiled store (SeasonStore.arrays) like split_matches: the training
+    matches as CompactMatches and the test match columns betting_columns takes, to be passed to main_arrays.
+    The odds and results stay zero-copy slices of the memory-mapped store, shared by every process that maps it.
+    `n_teams` is the number of interned team IDs.
+    """
+    n_matches = len(arrays["res"])
+    n_train, n_test = int(0.9 * n_matches), int(0.1 * n_matches)
+    train = CompactMatches.from_ids(
+        range(n_teams), arrays["visitor"][:n_train].tolist(), arrays["home"][:n_train].tolist(),
+        arrays["res"][:n_train].tolist()
+    )
+    test = slice(n_matches - n_test, n_matches)
+    columns = (
+        arrays["home"][test].tolist(), arrays["visitor"][test].tolist(), np.asarray(arrays["home_odds"][test]),
+        np.asarray(arrays["away_odds"][test]), np.asarray(arrays["res"][test]),
+    )
+    return train, columns
+
+
+def main_arrays(factor, k_factor, floor, win_rate_floor, ceil, season, prepared):
+    """
+    main on a season split by season_arrays, without building dataframes. Betting tables are cached like main's,
+    keyed by (season, factor, k_factor), so each pair is rated once per process. Gives the same balance as main.
+    """
+    key = (season, factor, k_factor)
+    table = _cached_table(key, prepared)
+    if table is None:
+        train, columns = prepared
+        ratings, _ = rate_compact(train, factor, k_factor)
+        table = betting_columns(ratings, *columns, factor)
+        _store_table(key, prepared, table)
+    return simulate_table(table, floor, win_rate_floor, ceil)
+
+
 # Running the model for multiple seasons
 if __name__ == "__main__":
     for season in ["19-20", "20-21", "21-22", "22-23", "23-24"]:
-        print(main(FACTOR, K, FLOOR, WIN_RATE_FLOOR, CEIL, season))
\ No newline at end of file
+        print(main(FACTOR, K, FLOOR, WIN_RATE_FLOOR, CEIL, season))
+        missing = missing_odds(season)
+        if missing:
+            print(f"{season}: {missing} test matches have no odds and were not bet on")
+        if instrumentation.ENABLED:
+            print(json.dumps(instrumentation.report()))
\ No newline at end of file
@@ -0,0 +1,155 @@
+import csv
+import math
+
+# Rating math shared by create_elo, predict_match and rating_store. Only the standard library is imported here,
+# so predictions and rating updates start without loading pandas.
+
+# Constants for ELO calculation
+DEFAULT_RATING = 1000
+FACTOR = 348.52756272674264
+K = 33
+FLOOR = 0.4756190754648416
+WIN_RATE_FLOOR = 0.2946325964931914
+CEIL = 0.9506928437169432
+
+
+def expected_win(rating_a, rating_b, factor):
+    """
+    Calculate the expected win probability for two teams based on their ELO ratings.
+    """
+    exp_a = math.exp(rating_a / factor)
+    exp_b = math.exp(rating_b / factor)
+    expected_a = exp_a / (exp_a + exp_b)
+    expected_b = exp_b / (exp_a + exp_b)
+    return expected_a, expected_b
+
+
+def update_elo(rating, expected, actual, k_factor):
+    """
+    Update the ELO rating for a team after a match.
+    """
+    return rating + k_factor * (actual - expected)
+
+
+def match_result(goals_home, goals_visitor):
+    """
+    1 for a home win and 0 for an away win, like the Res column of the match dataframes.
+    """
+    goal_diff = goals_home - goals_visitor
+    return (1 + goal_diff / abs(goal_diff)) / 2 if goal_diff else float("nan")
+
+
+class CompactMatches:
+    """
+    Matches with the team names interned to integer IDs once, as plain lists for the rating loop.
+    `df` is anything with Visitor, Home and Res columns: a dataframe or the dict of lists read_matches returns.
+    """
+
+    __slots__ = ("teams", "team_ids", "visitors", "homes", "results")
+
+    def __init__(self, df):
+        visitors, homes = list(df["Visitor"]), list(df["Home"])
+        self.teams = list(dict.fromkeys(visitors))
+        self.team_ids = {team: i for i, team in enumerate(self.teams)}
+        self.visitors = [self.team_ids[team] for team in visitors]
+        self.homes = [self.team_ids[team] for team in homes]
+        self.results = [float(result) for result in df["Res"]]
+
+    @classmethod
+    def from_ids(cls, teams, visitors, homes, results):
+        """
+        Build from columns whose team names are already interned, like the compiled season store.
+        """
+        matches = cls.__new__(cls)
+        matches.teams = list(teams)
+        matches.team_ids = {team: i for i, team in enumerate(matches.teams)}
+        matches.visitors, matches.homes = list(visitors), list(homes)
+        matches.results = [float(result) for result in results]
+        return matches
+
+    def __len__(self):
+        return len(self.results)
+
+
+def rate_compact(matches, factor, k_factor, history=False):
+    """
+    The rating loop of process_matches over CompactMatches, with ratings in a list indexed by team ID and
+    expected_win and update_elo inlined. The arithmetic is the same, so the ratings agree bit-for-bit.
+    Returns the ratings and, with history=True, each team's rating history, both indexed by team ID.
+    """
+    ratings = [DEFAULT_RATING] * len(matches.teams)
+    exp = math.exp
+    if not history:
+        for visitor, home, result in zip(matches.visitors, matches.homes, matches.results):
+            rating_visitor, rating_home = ratings[visitor], ratings[home]
+            exp_visitor, exp_home = exp(rating_visitor / factor), exp(rating_home / factor)
+            total = exp_visitor + exp_home
+            ratings[visitor] = rating_visitor + k_factor * ((1 - result) - exp_visitor / total)
+            ratings[home] = rating_home + k_factor * (result - exp_home / total)
+        return ratings, None
+
+    ratings_history = [[DEFAULT_RATING] for _ in matches.teams]
+    for visitor, home, result in zip(matches.visitors, matches.homes, matches.results):
+        rating_visitor, rating_home = ratings[visitor], ratings[home]
+        exp_visitor, exp_home = exp(rating_visitor / factor), exp(rating_home / factor)
+        total = exp_visitor + exp_home
+        ratings[visitor] = rating_visitor + k_factor * ((1 - result) - exp_visitor / total)
+        ratings[home] = rating_home + k_factor * (result - exp_home / total)
+        ratings_history[visitor].append(ratings[visitor])
+        ratings_history[home].append(ratings[home])
+    return ratings, ratings_history
+
+
+def process_matches(df, factor, k_factor, history=True):
+    """
+    Calculate ELO ratings for each team based on match results.
+    `df` is anything with Visitor, Home and Res columns: a dataframe or the dict of lists read_matches returns,
+    or CompactMatches built from one, which skips interning the team names again.
+    Returns the ratings and the rating history of each team, or None for the history with history=False.
+    """
+    matches = df if isinstance(df, CompactMatches) else CompactMatches(df)
+    ratings, ratings_history = rate_compact(matches, factor, k_factor, history)
+    return (
+        dict(zip(matches.teams, ratings)),
+        dict(zip(matches.teams, ratings_history)) if history else None,
+    )
+
+
+def pick_team(rating_home, rating_visitor, odds_home, odds_visitor, floor, win_rate_floor, factor):
+    """
+    Determine which team to bet on based on expected returns and win probabilities.
+    """
+    expected_home, expected_visitor = expected_win(rating_home, rating_visitor, factor)
+    return_home = expected_home * odds_home - 1
+    return_visitor = expected_visitor * odds_visitor - 1
+
+    flag_home = return_home > return_visitor
+    flag_bet = (flag_home and expected_home > win_rate_floor) or (
+        not flag_home and expected_visitor > win_rate_floor
+    )
+
+    return max(return_home, return_visitor), flag_home, flag_bet
+
+
+def read_matches(season):
+    """
+    Read the played matches of a season with the csv module, as a dict of Date, Visitor, Gv, Home, Gh and Res lists.
+    """
+    columns = {"Date": [], "Visitor": [], "Gv": [], "Home": [], "Gh": [], "Res": []}
+    with open(f"Database/{season}/{season}.csv", "r", encoding="utf-8", newline="") as file:
+        # Some seasons start with a blank line before the header, which pandas skips too
+        rows = (row for row in csv.reader(file) if row)
+        header = next(rows)
+        for values in rows:
+            row = dict(zip(header, values))
+            # Scheduled games without a score yet are not part of the results
+            if not row["Gv"] or not row["Gh"]:
+                continue
+            goals_visitor, goals_home = int(row["Gv"]), int(row["Gh"])
+            columns["Date"].append(row["Date"])
+            columns["Visitor"].append(row["Visitor"])
+            columns["Gv"].append(goals_visitor)
+            columns["Home"].append(row["Home"])
+            columns["Gh"].append(goals_home)
+            columns["Res"].append(match_result(goals_home, goals_visitor))
+    return columns
@@ -1,6 +1,18 @@
+import argparse
+import hashlib
+import itertools
+import json
+import os
 import random
+import time
+import zlib
 import numpy as np
-from create_elo import main
+from collections import OrderedDict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from create_elo import main, main_arrays, main_batch, bootstrap, clear_caches, season_arrays
+import instrumentation
+from season_store import STORE_PATH, all_seasons, compile_seasons, open_store, source_paths
 
 # Define ranges for the parameters
 FACTOR_RANGE = (100, 800)
@@ -15,10 +27,25 @@ POPULATION_SIZE = 20
 GENERATIONS = 10
 MUTATION_RATE = 0.1
 TOURNAMENT_SIZE = 5
+WORKERS = 1  # Processes used for fitness evaluation, 1 evaluates serially in this process
+START_METHOD = None  # How worker processes are started ("fork", "spawn" or "forkserver"), None for the default
+CACHE_SIZE = 4096  # Fitnesses and season balances remembered across generations, 0 disables the cache
+CACHE_DECIMALS = None  # Round float genes to this many decimals in cache keys, None for exact matches
+RACING = False  # Run seasons one at a time and stop evaluating individuals that cannot win a tournament
+BENCHMARK_SEEDS = [0, 1, 2, 3, 4]
+SURROGATE = False  # Breed extra children and only evaluate the ones a model of past evaluations ranks best
+SURROGATE_CANDIDATES = 5  # Children bred per place in the population when the surrogate screens them
+SURROGATE_RIDGE = 1e-3  # Regularization of the surrogate regression
+JOURNAL_PATH = "Database/ga_journal.jsonl"  # Every evaluated individual, reused as a cache by later runs
+CHECKPOINT_PATH = "Database/ga_checkpoint.json"  # Population and random state after the latest generation
 
 # Define weights for the fitness function
 BALANCE_WEIGHT = 1.0
 STABILITY_WEIGHT = 0.25
+BOOTSTRAP_QUANTILE = 0.1  # Quantile of the bootstrapped balances that bootstrap_fitness scores
+# "balance" scores each season by its balance and the fitness is their mean less their spread, "bootstrap" scores
+# each season by BOOTSTRAP_QUANTILE of its bootstrapped balances and the fitness is their mean
+FITNESS = "balance"
 
 def random_individual():
     """Generate a random individual with parameters excluding season."""
@@ -30,6 +57,16 @@ def random_individual():
         "ceil": random.uniform(*CEIL_RANGE)
     }
 
+def fitness_from_balances(balances):
+    """Combine average balance and stability (negative standard deviation) of per-season balances into a fitness."""
+    # Calculate mean and standard deviation of balances
+    avg_balance = np.mean(balances)
+    balance_std = np.std(balances)  # Use np.var(balances) if variance is preferred
+    
+    # Combine average balance and stability (negative standard deviation) in fitness
+    fitness = (BALANCE_WEIGHT * avg_balance) - (STABILITY_WEIGHT * balance_std)
+    return fitness
+
 def evaluate_individual(individual):
     """Evaluate an individual by averaging fitness across all seasons and minimizing balance variance."""
     # Calculate balances for each season
@@ -41,14 +78,341 @@ def evaluate_individual(individual):
         ceil=individual["ceil"],
         season=season
     ) for season in SEASONS]
-    
-    # Calculate mean and standard deviation of balances
-    avg_balance = np.mean(balances)
-    balance_std = np.std(balances)  # Use np.var(balances) if variance is preferred
-    
-    # Combine average balance and stability (negative standard deviation) in fitness
-    fitness = (BALANCE_WEIGHT * avg_balance) - (STABILITY_WEIGHT * balance_std)
-    return fitness
+    return fitness_from_balances(balances)
+
+def season_score(individual, season, fitness=FITNESS):
+    """Score one season for an individual: its balance, or a lower quantile of its bootstrapped balances."""
+    parameters = dict(
+        factor=individual["factor"],
+        k_factor=individual["k"],
+        floor=individual["floor"],
+        win_rate_floor=individual["win_rate_floor"],
+        ceil=individual["ceil"],
+        season=season
+    )
+    if fitness == "bootstrap":
+        return float(np.quantile(bootstrap(**parameters)[0], BOOTSTRAP_QUANTILE))
+    return main(**parameters)
+
+def fitness_from_scores(scores, fitness=FITNESS):
+    """Combine the per-season scores of an individual into its fitness."""
+    if fitness == "bootstrap":
+        return np.mean(scores)
+    return fitness_from_balances(scores)
+
+def bootstrap_fitness(individual):
+    """Score an individual by a lower quantile of its bootstrapped balances in each season, averaged over the seasons.
+    Unlike the spread of three season balances this reflects how much each season's result depends on luck."""
+    return fitness_from_scores([season_score(individual, season, "bootstrap") for season in SEASONS], "bootstrap")
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry and counts hits and misses."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+class EvaluationCache:
+    """LRU caches of individual fitnesses and per-season balances, keyed on the (optionally quantized) genes."""
+
+    def __init__(self, maxsize=CACHE_SIZE, decimals=CACHE_DECIMALS):
+        self.decimals = decimals
+        self.fitness = LRUCache(maxsize)
+        self.balances = LRUCache(maxsize * len(SEASONS))
+
+    def key(self, individual):
+        if self.decimals is None:
+            return tuple(sorted(individual.items()))
+        return tuple(sorted((gene, round(value, self.decimals)) for gene, value in individual.items()))
+
+    def report(self):
+        return (f"fitness cache {self.fitness.hits} hits / {self.fitness.misses} misses, "
+                f"season cache {self.balances.hits} hits / {self.balances.misses} misses")
+
+    def reset_stats(self):
+        self.fitness.reset_stats()
+        self.balances.reset_stats()
+
+def data_fingerprint(season):
+    """Hash of the results and odds files a season's balances are computed from."""
+    digest = hashlib.sha1()
+    for path in source_paths(season):
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+class EvaluationJournal:
+    """Append-only JSON lines file of evaluated individuals with their per-season balances and fitness.
+    Each balance is stored with the fingerprint of the season data, so it is only reused while that data is unchanged.
+    Season scores of the bootstrap fitness are journaled too, marked so they are never mixed up with balances."""
+
+    def __init__(self, path=JOURNAL_PATH, fitness=FITNESS):
+        self.path = path
+        self.fitness = fitness
+        self.fingerprints = {season: data_fingerprint(season) for season in SEASONS}
+        self.recorded = set()
+
+    def load(self, cache):
+        """Put the journaled balances and fitnesses that match the current data into the cache. Returns how many."""
+        if not os.path.exists(self.path):
+            return 0
+        loaded = 0
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # A line cut short when a run was killed
+                if record.get("score", "balance") != self.fitness:
+                    continue
+                key = cache.key(record["individual"])
+                balances = {season: balance for season, balance in record["balances"].items()
+                            if record["data"].get(season) == self.fingerprints.get(season)}
+                for season, balance in balances.items():
+                    cache.balances.put((key, season), balance)
+                # The fitness is recomputed, so a journal stays valid when the fitness weights change
+                if len(balances) == len(SEASONS):
+                    cache.fitness.put(key, fitness_from_scores([balances[season] for season in SEASONS], self.fitness))
+                    self.recorded.add(tuple(sorted(record["individual"].items())))
+                    loaded += 1
+        return loaded
+
+    def record(self, population, cache):
+        """Append the fully evaluated individuals of the population that are not journaled yet."""
+        with open(self.path, "a", encoding="utf-8") as file:
+            for individual in population:
+                exact_key = tuple(sorted(individual.items()))
+                key = cache.key(individual)
+                # Peek at the cache entries directly, so the hit and miss counts are left alone
+                fitness = cache.fitness.entries.get(key)
+                balances = [cache.balances.entries.get((key, season)) for season in SEASONS]
+                if exact_key in self.recorded or fitness is None or None in balances:
+                    continue
+                file.write(json.dumps({
+                    "individual": individual,
+                    "data": self.fingerprints,
+                    "balances": dict(zip(SEASONS, balances)),
+                    "score": self.fitness,
+                    "fitness": fitness,
+                }) + "\n")
+                self.recorded.add(exact_key)
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint to a temporary file first, so a kill never leaves a half-written checkpoint."""
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(checkpoint, file)
+    os.replace(path + ".tmp", path)
+
+def load_checkpoint(path, population_size, fitness=FITNESS):
+    """The checkpoint at path if it exists and was written for the same population size, fitness and season data,
+    else None."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as file:
+        checkpoint = json.load(file)
+    fingerprints = {season: data_fingerprint(season) for season in SEASONS}
+    if (checkpoint["population_size"] != population_size or checkpoint.get("fitness", "balance") != fitness
+            or checkpoint["data"] != fingerprints):
+        return None
+    return checkpoint
+
+def task_seed(generation, index, season):
+    """Deterministic seed for one (individual, season) evaluation task, independent of which worker runs it."""
+    return zlib.crc32(f"{generation}:{index}:{season}".encode())
+
+# Seasons of the memory-mapped store split by season_arrays, attached once per worker process by attach_seasons
+_SHARED_SEASONS = {}
+
+def prepare_seasons(path=STORE_PATH):
+    """Compile the season store if it is missing or older than any source of SEASONS, before workers map it."""
+    store = open_store(path)
+    if store is None or not all(store.is_fresh(season) for season in SEASONS):
+        compile_seasons(sorted(set(all_seasons()) | set(SEASONS)), path)
+
+def attach_seasons(path=STORE_PATH):
+    """Worker initializer: map the season store, so every worker reads the same pages instead of its own copy,
+    and intern each season's training matches once. Workers on the store never import pandas."""
+    store = open_store(path)
+    if store is None:
+        return
+    for season in SEASONS:
+        if store.is_fresh(season):
+            _SHARED_SEASONS[season] = season_arrays(store.arrays(season), len(store.teams))
+
+def evaluate_task(task):
+    """Score one (individual, season) task inside a worker process."""
+    individual, season, seed, fitness = task
+    random.seed(seed)
+    if fitness == "bootstrap":
+        return season_score(individual, season, fitness)
+    if season in _SHARED_SEASONS:
+        return main_arrays(individual["factor"], individual["k"], individual["floor"], individual["win_rate_floor"],
+                           individual["ceil"], season, _SHARED_SEASONS[season])
+    return main(
+        factor=individual["factor"],
+        k_factor=individual["k"],
+        floor=individual["floor"],
+        win_rate_floor=individual["win_rate_floor"],
+        ceil=individual["ceil"],
+        season=season
+    )
+
+def evaluate_balances(population, pairs, executor=None, workers=1, generation=0, fitness=FITNESS):
+    """Score (index, season) pairs of the population, batched per season or spread over a process pool.
+    The scores are main's balances, or bootstrap quantiles with fitness="bootstrap"."""
+    if executor is not None:
+        tasks = [(population[i], season, task_seed(generation, i, season), fitness) for i, season in pairs]
+        chunksize = max(1, len(tasks) // (4 * workers))
+        return dict(zip(pairs, executor.map(evaluate_task, tasks, chunksize=chunksize)))
+    if fitness == "bootstrap":
+        return {(i, season): season_score(population[i], season, fitness) for i, season in pairs}
+
+    balances = {}
+    for season in SEASONS:
+        indices = [i for i, pair_season in pairs if pair_season == season]
+        if not indices:
+            continue
+        batch = [population[i] for i in indices]
+        balances.update(zip([(i, season) for i in indices], main_batch(
+            factors=[ind["factor"] for ind in batch],
+            k_factors=[ind["k"] for ind in batch],
+            floors=[ind["floor"] for ind in batch],
+            win_rate_floors=[ind["win_rate_floor"] for ind in batch],
+            ceils=[ind["ceil"] for ind in batch],
+            season=season
+        )))
+    return balances
+
+def fitness_bounds(scores, ranges, fitness=FITNESS):
+    """Lowest and highest fitness reachable from the scores of the seasons run so far, with each remaining season
+    scoring anywhere in its (low, high) range. The fitness is concave in the scores, so its minimum lies on a corner
+    of the ranges, and it never exceeds the weighted mean of the highest scores."""
+    lowest = min(fitness_from_scores(list(scores) + list(corner), fitness) for corner in itertools.product(*ranges))
+    highest = np.mean(list(scores) + [high for _, high in ranges])
+    return lowest, highest if fitness == "bootstrap" else BALANCE_WEIGHT * highest
+
+def race(alive, season_balances, seen_seasons, bounds, copies, season_ranges, budget, fitness=FITNESS):
+    """Racing step: drop the alive individuals that are certainly below all but TOURNAMENT_SIZE - 1 places of the
+    population, whatever they score on the remaining seasons within `season_ranges`. Such an individual cannot win
+    a tournament, so as long as at most `budget` places (TOURNAMENT_SIZE - 1 per generation) are dropped, selection
+    and the best solution are the same as without racing. `bounds` maps every other individual to the (lowest,
+    highest) fitness it can have and `copies` every individual to its number of places in the population.
+    Returns the survivors and the bounds of the dropped individuals."""
+    unseen = [season for season in SEASONS if season not in seen_seasons]
+    if not all(season in season_ranges for season in unseen):
+        return alive, {}
+    ranges = [season_ranges[season] for season in unseen]
+    bounds = dict(bounds)
+    for key in alive:
+        bounds[key] = fitness_bounds([season_balances[key, season] for season in seen_seasons], ranges, fitness)
+
+    places = sum(copies.values())
+    dropped = {}
+    for key in sorted(alive, key=lambda key: bounds[key][1]):
+        above = sum(copies[other] for other, (lowest, _) in bounds.items() if lowest > bounds[key][1])
+        if above < places - (TOURNAMENT_SIZE - 1) or copies[key] > budget:
+            break
+        dropped[key] = bounds[key]
+        budget -= copies[key]
+    return [key for key in alive if key not in dropped], dropped
+
+def update_season_ranges(season_ranges, season_balances):
+    """Widen the (low, high) range of each season to cover the given (key, season) scores."""
+    for (_, season), score in season_balances.items():
+        low, high = season_ranges.get(season, (score, score))
+        season_ranges[season] = (min(low, score), max(high, score))
+
+def evaluate_population(population, executor=None, workers=1, generation=0, cache=None, racing=False, stats=None,
+                        fitness=FITNESS, season_ranges=None):
+    """Evaluate a whole population, giving the same fitnesses as evaluate_individual, or bootstrap_fitness with
+    fitness="bootstrap".
+    Without an executor each season is one batched main call, otherwise (individual, season) tasks go to the pool.
+    With a cache, individuals and seasons that were already scored are not run again.
+    With racing, seasons are run one at a time and individuals that cannot win a tournament are dropped early (see
+    race). `season_ranges` holds the range of each season's scores in earlier generations and is widened with this
+    one's; a season only takes part in racing once it has a range. A dropped individual's fitness is its highest
+    possible fitness, capped just below the lowest complete fitness of the population, so it never outranks a fully
+    evaluated individual in selection. Dropped fitnesses are not cached. `stats` counts season evaluations run and
+    saved."""
+    # Look up every distinct individual, only the first copy of a repeated individual gets evaluated
+    keys = [cache.key(ind) for ind in population] if cache is not None else list(range(len(population)))
+    first = {}
+    for i, key in enumerate(keys):
+        first.setdefault(key, i)
+    if cache is not None:
+        cache.fitness.hits += len(keys) - len(first)
+    copies = {key: keys.count(key) for key in first}
+    season_ranges = season_ranges if season_ranges is not None else {}
+
+    fitnesses, season_balances, alive, dropped = {}, {}, [], {}
+    for key in first:
+        cached = cache.fitness.get(key) if cache is not None else None
+        if cached is not None:
+            fitnesses[key] = cached
+        else:
+            alive.append(key)
+
+    stages = [[season] for season in SEASONS] if racing else [SEASONS]
+    seen_seasons = []
+    for stage in stages:
+        pairs = []
+        for key in alive:
+            for season in stage:
+                balance = cache.balances.get((key, season)) if cache is not None else None
+                if balance is None:
+                    pairs.append((first[key], season))
+                else:
+                    season_balances[key, season] = balance
+        for (i, season), balance in evaluate_balances(population, pairs, executor, workers, generation, fitness).items():
+            if cache is not None:
+                cache.balances.put((keys[i], season), balance)
+            season_balances[keys[i], season] = balance
+        if stats is not None:
+            stats["season_evaluations"] = stats.get("season_evaluations", 0) + len(pairs)
+        seen_seasons += stage
+
+        if racing and len(seen_seasons) < len(SEASONS) and alive:
+            bounds = {key: (value, value) for key, value in fitnesses.items()}
+            bounds.update(dropped)
+            budget = TOURNAMENT_SIZE - 1 - sum(copies[key] for key in dropped)
+            survivors, newly_dropped = race(alive, season_balances, seen_seasons, bounds, copies, season_ranges, budget,
+                                            fitness)
+            dropped.update(newly_dropped)
+            if stats is not None:
+                saved = (len(alive) - len(survivors)) * (len(SEASONS) - len(seen_seasons))
+                stats["season_evaluations_saved"] = stats.get("season_evaluations_saved", 0) + saved
+            alive = survivors
+
+    for key in alive:
+        fitnesses[key] = fitness_from_scores([season_balances[key, season] for season in SEASONS], fitness)
+        if cache is not None:
+            cache.fitness.put(key, fitnesses[key])
+    update_season_ranges(season_ranges, season_balances)
+    if dropped:
+        worst_complete = np.nextafter(min(fitnesses.values()), -np.inf)
+        for key, (_, highest) in dropped.items():
+            fitnesses[key] = min(highest, worst_complete)
+    return [fitnesses[key] for key in keys]
 
 def tournament_selection(population, fitnesses):
     selected = random.sample(list(zip(population, fitnesses)), TOURNAMENT_SIZE)
@@ -75,24 +439,242 @@ def mutate(individual):
     if random.random() < MUTATION_RATE:
         individual["ceil"] = random.uniform(*CEIL_RANGE)
 
-def genetic_algorithm():
-    population = [random_individual() for _ in range(POPULATION_SIZE)]
-    for generation in range(GENERATIONS):
-        fitnesses = [evaluate_individual(ind) for ind in population]
-        new_population = []
-        while len(new_population) < POPULATION_SIZE:
-            parent1 = tournament_selection(population, fitnesses)
-            parent2 = tournament_selection(population, fitnesses)
-            child1, child2 = crossover(parent1, parent2)
-            mutate(child1)
-            mutate(child2)
-            new_population.extend([child1, child2])
-        population = new_population
-    final_fitnesses = [evaluate_individual(ind) for ind in population]
+def next_generation(population, fitnesses, size=None):
+    """Breed a new population, of the same size by default, with tournament selection, crossover and mutation."""
+    size = len(population) if size is None else size
+    new_population = []
+    while len(new_population) < size:
+        parent1 = tournament_selection(population, fitnesses)
+        parent2 = tournament_selection(population, fitnesses)
+        child1, child2 = crossover(parent1, parent2)
+        mutate(child1)
+        mutate(child2)
+        new_population.extend([child1, child2])
+    return new_population
+
+class QuadraticSurrogate:
+    """Ridge regression of fitness on the genes scaled to [0, 1], their squares and their pairwise products."""
+
+    GENE_RANGES = {
+        "factor": FACTOR_RANGE,
+        "k": K_RANGE,
+        "floor": FLOOR_RANGE,
+        "win_rate_floor": WIN_RATE_FLOOR_RANGE,
+        "ceil": CEIL_RANGE,
+    }
+
+    def __init__(self, ridge=SURROGATE_RIDGE):
+        self.ridge = ridge
+        self.weights = None
+
+    def features(self, individuals):
+        genes = np.array([[(individual[gene] - low) / (high - low) for gene, (low, high) in self.GENE_RANGES.items()]
+                          for individual in individuals])
+        rows, columns = np.triu_indices(genes.shape[1])
+        return np.hstack([np.ones((len(genes), 1)), genes, genes[:, rows] * genes[:, columns]])
+
+    def fit(self, individuals, fitnesses):
+        """Fit the model, returning False while there are fewer evaluations than model terms."""
+        features = self.features(individuals)
+        if len(features) < features.shape[1]:
+            return False
+        gram = features.T @ features + self.ridge * np.eye(features.shape[1])
+        self.weights = np.linalg.solve(gram, features.T @ np.asarray(fitnesses, dtype=float))
+        return True
+
+    def predict(self, individuals):
+        return self.features(individuals) @ self.weights
+
+def screened_generation(population, fitnesses, surrogate, candidates=SURROGATE_CANDIDATES):
+    """Breed `candidates` children per place in the population and keep the ones the surrogate predicts fittest."""
+    children = next_generation(population, fitnesses, candidates * len(population))
+    ranked = np.argsort(-surrogate.predict(children), kind="stable")
+    return [children[i] for i in ranked[:len(population)]]
+
+def start_workers(workers, start_method=START_METHOD, shared=True):
+    """Process pool for fitness evaluation. With shared=True the workers map the compiled season store,
+    otherwise each one loads the seasons itself."""
+    if shared:
+        prepare_seasons()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(start_method),
+        initializer=attach_seasons if shared else None,
+    )
+
+def genetic_algorithm(workers=WORKERS, seed=None, cache_size=CACHE_SIZE, cache_decimals=CACHE_DECIMALS,
+                      racing=RACING, stats=None, verbose=True, population_size=POPULATION_SIZE,
+                      journal_path=None, checkpoint_path=None, resume=False, surrogate=SURROGATE, time_limit=None,
+                      fitness=FITNESS, generations=GENERATIONS):
+    """Run the GA and return the best individual of the final population and its fitness.
+    With journal_path, evaluations are appended to a journal and journaled ones are not run again (this needs the
+    cache, which is then kept even with cache_size 0). With checkpoint_path, the population and random state are
+    saved after every generation, and resume=True continues from that checkpoint if it matches this run.
+    With surrogate=True children are screened by a QuadraticSurrogate fitted to every evaluation so far; its training
+    set is checkpointed too, so a resumed run continues exactly like an uninterrupted one.
+    Without time_limit the GA runs `generations` generations. With time_limit it keeps breeding new generations until
+    that many seconds have passed, however many generations that takes, and then evaluates the last one.
+    fitness="bootstrap" scores individuals with bootstrap_fitness instead of evaluate_individual."""
+    start = time.perf_counter()
+    if seed is not None:
+        random.seed(seed)
+    cache = EvaluationCache(cache_size, cache_decimals) if cache_size > 0 else None
+    journal = None
+    if journal_path is not None:
+        cache = cache if cache is not None else EvaluationCache(CACHE_SIZE, cache_decimals)
+        journal = EvaluationJournal(journal_path, fitness)
+        loaded = journal.load(cache)
+        if verbose:
+            print(f"Loaded {loaded} journaled evaluations from {journal_path}")
+
+    start_generation, population = 0, None
+    checkpoint = load_checkpoint(checkpoint_path, population_size, fitness) if resume and checkpoint_path else None
+    if checkpoint is not None:
+        start_generation, population = checkpoint["generation"], checkpoint["population"]
+        version, internal_state, gauss_next = checkpoint["random_state"]
+        random.setstate((version, tuple(internal_state), gauss_next))
+        if verbose:
+            print(f"Resuming from generation {start_generation} of {checkpoint_path}")
+    elif resume and verbose:
+        print(f"No matching checkpoint at {checkpoint_path}, starting a new run")
+    fingerprints = {season: data_fingerprint(season) for season in SEASONS} if checkpoint_path else None
+
+    executor = start_workers(workers) if workers > 1 else None
+
+    stats = stats if stats is not None else {}
+    model = QuadraticSurrogate() if surrogate else None
+    # Ranges of the season scores seen so far, which racing needs to bound the seasons an individual has not run
+    season_ranges = {}
+    if checkpoint is not None:
+        season_ranges.update((season, tuple(bounds)) for season, bounds in checkpoint.get("season_ranges", {}).items())
+    evaluated, evaluated_fitnesses = [], []
+    if model is not None and checkpoint is not None and "surrogate" in checkpoint:
+        evaluated.extend(checkpoint["surrogate"]["individuals"])
+        evaluated_fitnesses.extend(checkpoint["surrogate"]["fitnesses"])
+
+    def evaluate(population, generation, final=False):
+        # The final population is always fully evaluated, so the best solution has a complete fitness
+        generation_stats = {}
+        with instrumentation.stage("evaluate_population", "ga"):
+            fitnesses = evaluate_population(population, executor, workers, generation, cache,
+                                            racing and not final, generation_stats, fitness, season_ranges)
+        for name, value in generation_stats.items():
+            stats[name] = stats.get(name, 0) + value
+        if cache is not None:
+            if verbose:
+                print(f"Generation {generation}: {cache.report()}")
+            cache.reset_stats()
+        if racing and verbose:
+            print(f"Generation {generation}: racing ran {generation_stats.get('season_evaluations', 0)} season "
+                  f"evaluations, saved {generation_stats.get('season_evaluations_saved', 0)}")
+        if journal is not None:
+            journal.record(population, cache)
+        if model is not None:
+            evaluated.extend(population)
+            evaluated_fitnesses.extend(fitnesses)
+        if instrumentation.ENABLED:
+            instrumentation.count("individuals", len(population), "ga")
+            print(json.dumps({"generation": generation, "report": instrumentation.report()}))
+        return fitnesses
+
+    try:
+        if population is None:
+            population = [random_individual() for _ in range(population_size)]
+        generation = start_generation
+        while (generation < generations if time_limit is None else time.perf_counter() - start < time_limit):
+            fitnesses = evaluate(population, generation)
+            if model is not None and model.fit(evaluated, evaluated_fitnesses):
+                population = screened_generation(population, fitnesses, model)
+                stats["screened_out"] = stats.get("screened_out", 0) + (SURROGATE_CANDIDATES - 1) * population_size
+                if verbose:
+                    print(f"Generation {generation}: surrogate kept {population_size} of "
+                          f"{SURROGATE_CANDIDATES * population_size} children")
+            else:
+                population = next_generation(population, fitnesses)
+            if checkpoint_path is not None:
+                save_checkpoint(checkpoint_path, {
+                    "generation": generation + 1,
+                    "population": population,
+                    "random_state": random.getstate(),
+                    "population_size": population_size,
+                    "fitness": fitness,
+                    "data": fingerprints,
+                    "surrogate": {"individuals": evaluated, "fitnesses": [float(value) for value in evaluated_fitnesses]},
+                    "season_ranges": {season: [float(low), float(high)] for season, (low, high) in season_ranges.items()},
+                })
+            generation += 1
+        stats["generations"] = generation
+        final_fitnesses = evaluate(population, generation, final=True)
+    finally:
+        if executor is not None:
+            executor.shutdown()
     best = population[final_fitnesses.index(max(final_fitnesses))]
     return best, max(final_fitnesses)
 
+def racing_report(seeds=BENCHMARK_SEEDS):
+    """Run the GA with and without racing for each seed, comparing the best solutions and the work done.
+    The cache is off so every season evaluation counts."""
+    rows = []
+    for seed in seeds:
+        plain_stats, racing_stats = {}, {}
+        plain = genetic_algorithm(seed=seed, cache_size=0, racing=False, stats=plain_stats, verbose=False)
+        raced = genetic_algorithm(seed=seed, cache_size=0, racing=True, stats=racing_stats, verbose=False)
+        rows.append({
+            "seed": seed,
+            "same_best": plain[0] == raced[0],
+            "plain_fitness": plain[1],
+            "racing_fitness": raced[1],
+            "season_evaluations": racing_stats.get("season_evaluations", 0),
+            "plain_season_evaluations": plain_stats.get("season_evaluations", 0),
+            "season_evaluations_saved": racing_stats.get("season_evaluations_saved", 0),
+        })
+    return rows
+
+def surrogate_report(seeds=BENCHMARK_SEEDS):
+    """Run the surrogate-assisted GA for each seed, then the plain GA breeding for as long as the surrogate run took,
+    and compare their best fitnesses, generations and true season evaluations. The GA cache is off so every season
+    evaluation counts, and both runs start from cold rating caches."""
+    rows = []
+    for seed in seeds:
+        surrogate_stats, plain_stats = {}, {}
+        clear_caches()
+        start = time.perf_counter()
+        _, surrogate_fitness = genetic_algorithm(seed=seed, cache_size=0, surrogate=True, stats=surrogate_stats,
+                                                 verbose=False)
+        seconds = time.perf_counter() - start
+        clear_caches()
+        _, plain_fitness = genetic_algorithm(seed=seed, cache_size=0, stats=plain_stats, verbose=False,
+                                             time_limit=seconds)
+        rows.append({
+            "seed": seed,
+            "seconds": seconds,
+            "surrogate_fitness": surrogate_fitness,
+            "plain_fitness": plain_fitness,
+            "surrogate_generations": surrogate_stats["generations"],
+            "plain_generations": plain_stats["generations"],
+            "surrogate_season_evaluations": surrogate_stats.get("season_evaluations", 0),
+            "plain_season_evaluations": plain_stats.get("season_evaluations", 0),
+            "children_screened_out": surrogate_stats.get("screened_out", 0),
+        })
+    return rows
+
 # Run GA
-best_solution, best_fitness = genetic_algorithm()
-print("Best solution:", best_solution)
-print("Best fitness (average balance adjusted for stability):", best_fitness)
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the ELO and betting parameters with a genetic algorithm.")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--racing", action="store_true",
+                        help="stop evaluating individuals that cannot win a tournament early")
+    parser.add_argument("--journal", default=JOURNAL_PATH, help="evaluation journal to reuse and append to")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="file to checkpoint every generation to")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument("--surrogate", action="store_true", help="screen extra children with a model of past fitnesses")
+    parser.add_argument("--bootstrap", action="store_true", help="score seasons by a low quantile of bootstrapped balances")
+    args = parser.parse_args()
+
+    best_solution, best_fitness = genetic_algorithm(
+        args.workers, args.seed, racing=args.racing, journal_path=args.journal, checkpoint_path=args.checkpoint,
+        resume=args.resume, surrogate=args.surrogate, fitness="bootstrap" if args.bootstrap else "balance"
+    )
+    print("Best solution:", best_solution)
+    print("Best fitness (average balance adjusted for stability):", best_fitness)
\ No newline at end of file
@@ -0,0 +1,82 @@
+import os
+import time
+from collections import defaultdict
+
+# Off unless enabled here or with MATCH_PREDICT_INSTRUMENT=1, when off every hook returns straight away
+ENABLED = os.environ.get("MATCH_PREDICT_INSTRUMENT", "") not in ("", "0")
+
+# Wall time and call count per (scope, stage), and domain counters per (scope, counter)
+_seconds = defaultdict(float)
+_calls = defaultdict(int)
+_counters = defaultdict(int)
+
+
+def enable(enabled=True):
+    """
+    Turn recording on or off for the whole process.
+    """
+    global ENABLED
+    ENABLED = enabled
+
+
+class _Stage:
+    __slots__ = ("key", "start")
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _seconds[self.key] += time.perf_counter() - self.start
+        _calls[self.key] += 1
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name, scope="all"):
+    """
+    Context manager that adds the wall time of its block to a stage, scoped e.g. by season.
+    """
+    if not ENABLED:
+        return _NO_STAGE
+    return _Stage((scope, name))
+
+
+def count(name, amount=1, scope="all"):
+    """
+    Add to a domain counter, such as bets placed or matches without odds.
+    """
+    if ENABLED:
+        _counters[scope, name] += int(amount)
+
+
+def report(reset=True):
+    """
+    Everything recorded so far, as {scope: {"stages": {stage: {"seconds", "calls"}}, "counters": {...}}}.
+    """
+    result = {}
+    for (scope, name), seconds in _seconds.items():
+        stages = result.setdefault(scope, {"stages": {}, "counters": {}})["stages"]
+        stages[name] = {"seconds": seconds, "calls": _calls[scope, name]}
+    for (scope, name), value in _counters.items():
+        result.setdefault(scope, {"stages": {}, "counters": {}})["counters"][name] = value
+    if reset:
+        _seconds.clear()
+        _calls.clear()
+        _counters.clear()
+    return result
@@ -0,0 +1,233 @@
+import argparse
+import ipaddress
+import os
+import random
+import socket
+import time
+from multiprocessing import Process
+from multiprocessing.connection import Client, Listener
+from create_elo import clear_caches, load_season
+import genetic_algorithm
+from genetic_algorithm import (
+    GENERATIONS,
+    POPULATION_SIZE,
+    SEASONS,
+    EvaluationCache,
+    evaluate_population,
+    next_generation,
+    random_individual,
+)
+
+# Island model: every island evolves its own population in its own process, and every MIGRATION_INTERVAL
+# generations the MIGRANTS best individuals of each island replace the worst ones of the next island in a ring.
+# Islands talk to one hub over multiprocessing connections, which work over TCP, so they can run on other hosts.
+ISLANDS = 4
+MIGRATION_INTERVAL = 3
+MIGRANTS = 2
+ADDRESS = ("localhost", 6071)
+# Connections are authenticated with a key and carry pickles, which run code when received. The fallback key is
+# public, so it is only accepted on loopback addresses, across machines MATCH_PREDICT_ISLAND_KEY must be set
+KEY_VARIABLE = "MATCH_PREDICT_ISLAND_KEY"
+LOOPBACK_KEY = b"match_predict"
+
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def island_authkey(address):
+    """
+    The key for a hub or island at `address`: MATCH_PREDICT_ISLAND_KEY if set, else the fallback key for loopback
+    addresses only. Raises ValueError for any other address, so no unauthenticated pickles cross the network.
+    """
+    key = os.environ.get(KEY_VARIABLE)
+    if key:
+        return key.encode()
+    if is_loopback(address[0]):
+        return LOOPBACK_KEY
+    raise ValueError(f"set {KEY_VARIABLE} to a shared secret to listen on or connect to {address[0]}")
+
+
+def migration_generations(generations, interval):
+    """
+    Generations after whose evaluation the islands exchange migrants.
+    """
+    return [generation for generation in range(1, generations) if generation % interval == 0]
+
+
+def island_seed(seed, island):
+    return None if seed is None else seed * 1000 + island
+
+
+def run_island(connection):
+    """
+    Evolve one island as told by the hub on `connection`, trading migrants with it, and send back the result.
+    """
+    config = connection.recv()
+    random.seed(config["seed"])
+    start = time.perf_counter()
+    cache = EvaluationCache()
+    migrations = set(migration_generations(config["generations"], config["migration_interval"]))
+
+    population = [random_individual() for _ in range(config["population_size"])]
+    for generation in range(config["generations"]):
+        fitnesses = evaluate_population(population, generation=generation, cache=cache)
+        if generation in migrations:
+            ranked = sorted(range(len(population)), key=fitnesses.__getitem__, reverse=True)
+            connection.send([(population[i], fitnesses[i]) for i in ranked[:config["migrants"]]])
+            # Migrants take the places of the worst individuals, before selection for the next generation
+            for i, (individual, fitness) in zip(ranked[::-1], connection.recv()):
+                population[i], fitnesses[i] = individual, fitness
+        population = next_generation(population, fitnesses)
+    fitnesses = evaluate_population(population, generation=config["generations"], cache=cache)
+
+    best = max(range(len(population)), key=fitnesses.__getitem__)
+    connection.send({
+        "island": config["island"],
+        "best": population[best],
+        "fitness": float(fitnesses[best]),
+        "evaluations": cache.fitness.misses,
+        "seconds": time.perf_counter() - start,
+    })
+
+
+def island_worker(address=ADDRESS, authkey=None):
+    """
+    Connect to a hub and run one island for it.
+    """
+    authkey = authkey if authkey is not None else island_authkey(address)
+    with Client(address, authkey=authkey) as connection:
+        run_island(connection)
+
+
+def run_islands(islands=ISLANDS, seed=None, local=None, address=ADDRESS, authkey=None,
+                population_size=POPULATION_SIZE, generations=GENERATIONS,
+                migration_interval=MIGRATION_INTERVAL, migrants=MIGRANTS):
+    """
+    Run the hub: wait for `islands` islands to connect, `local` of them started here (all by default), relay
+    migrants around the ring and collect the results. Migration is synchronous, so a seeded run gives the same
+    result however the islands are spread over processes and hosts.
+    Returns the best individual, its fitness and the per-island results.
+    """
+    local = islands if local is None else local
+    authkey = authkey if authkey is not None else island_authkey(address)
+    if local:
+        # Parse the seasons before starting the islands, so forked processes inherit the cache
+        for season in SEASONS:
+            load_season(season)
+
+    with Listener(address, authkey=authkey) as listener:
+        processes = [Process(target=island_worker, args=(listener.address, authkey)) for _ in range(local)]
+        for process in processes:
+            process.start()
+        connections = [listener.accept() for _ in range(islands)]
+
+    try:
+        for island, connection in enumerate(connections):
+            connection.send({
+                "island": island,
+                "seed": island_seed(seed, island),
+                "population_size": population_size,
+                "generations": generations,
+                "migration_interval": migration_interval,
+                "migrants": migrants,
+            })
+        for _ in migration_generations(generations, migration_interval):
+            outgoing = [connection.recv() for connection in connections]
+            for island, connection in enumerate(connections):
+                connection.send(outgoing[island - 1])
+        results = sorted((connection.recv() for connection in connections), key=lambda result: result["island"])
+    finally:
+        for connection in connections:
+            connection.close()
+        for process in processes:
+            process.join()
+
+    best = max(results, key=lambda result: result["fitness"])
+    return best["best"], best["fitness"], results
+
+
+def preload_seasons():
+    """
+    Start from cold rating caches with the seasons already parsed, so timed runs only pay for the GA itself.
+    """
+    clear_caches()
+    for season in SEASONS:
+        load_season(season)
+
+
+def compare(islands=ISLANDS, seed=0, population_size=POPULATION_SIZE, generations=GENERATIONS):
+    """
+    Run the islands on this machine and a serial GA with the same total population, and report both.
+    Both runs start from the same state: cold rating caches and parsed seasons.
+    """
+    preload_seasons()
+    start = time.perf_counter()
+    serial_best, serial_fitness = genetic_algorithm.genetic_algorithm(
+        seed=seed, verbose=False, population_size=islands * population_size, generations=generations
+    )
+    serial_seconds = time.perf_counter() - start
+
+    preload_seasons()
+    start = time.perf_counter()
+    island_best, island_fitness, results = run_islands(
+        islands, seed, population_size=population_size, generations=generations
+    )
+    island_seconds = time.perf_counter() - start
+    return {
+        "islands": islands,
+        "population_size": population_size,
+        "serial_seconds": serial_seconds,
+        "island_seconds": island_seconds,
+        "speedup": serial_seconds / island_seconds,
+        "serial_fitness": float(serial_fitness),
+        "island_fitness": island_fitness,
+        "serial_best": serial_best,
+        "island_best": island_best,
+        "island_fitnesses": [result["fitness"] for result in results],
+    }
+
+
+def parse_address(text):
+    host, port = text.rsplit(":", 1)
+    return host, int(port)
+
+
+# Compare with the serial GA locally:   python island_model.py compare --islands 4
+# Spread islands over several machines, with the same secret MATCH_PREDICT_ISLAND_KEY set on every host:
+#                                       python island_model.py hub --listen 0.0.0.0:6071 --islands 8 --local 4
+#                                 and:  python island_model.py island --connect hub-host:6071   (on each other host)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Island-model GA with migration between processes and hosts.")
+    parser.add_argument("mode", choices=["compare", "hub", "island"])
+    parser.add_argument("--islands", type=int, default=ISLANDS, help="islands in the ring")
+    parser.add_argument("--local", type=int, help="islands the hub starts itself, the others connect to it")
+    parser.add_argument("--population", type=int, default=POPULATION_SIZE, help="population of each island")
+    parser.add_argument("--generations", type=int, default=GENERATIONS)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--listen", type=parse_address, default=ADDRESS, help="host:port the hub listens on")
+    parser.add_argument("--connect", type=parse_address, default=ADDRESS, help="host:port of the hub")
+    args = parser.parse_args()
+
+    if args.mode == "island":
+        island_worker(args.connect)
+    elif args.mode == "hub":
+        best_solution, best_fitness, results = run_islands(
+            args.islands, args.seed, args.local, args.listen, population_size=args.population,
+            generations=args.generations
+        )
+        for result in results:
+            print(f"Island {result['island']}: fitness {result['fitness']}, {result['evaluations']} evaluations, "
+                  f"{result['seconds']:.2f}s")
+        print("Best solution:", best_solution)
+        print("Best fitness (average balance adjusted for stability):", best_fitness)
+    else:
+        report = compare(args.islands, 0 if args.seed is None else args.seed, args.population, args.generations)
+        print(f"Serial GA, population {args.islands * args.population}: fitness {report['serial_fitness']}, "
+              f"{report['serial_seconds']:.2f}s")
+        print(f"{args.islands} islands of {args.population}: fitness {report['island_fitness']}, "
+              f"{report['island_seconds']:.2f}s, speedup {report['speedup']:.2f}x")
+        print("Best solution:", report["island_best"])
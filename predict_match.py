@@ -1,4 +1,10 @@
-from create_elo import *
+import argparse
+import json
+import math
+import sys
+import time
+from elo_core import *
+from rating_store import update_ratings
 
 # ELO constants
 DEFAULT_RATING = 1000
@@ -15,19 +21,200 @@ odds_home = 2.5
 odds_visitor = 1.54
 season = "24-25"
 
-    # Load and preprocess match data
-file_path = f"Database/{season}/{season}.csv"
-df = pd.read_csv(file_path)
-df["Res"] = (df["Gh"] - df["Gv"]).apply(lambda x: (1 + x / abs(x)) / 2)
 
-rating, _ = process_matches(df, FACTOR, K)
+def load_ratings(season, factor=FACTOR, k_factor=K):
+    """
+    Rate every team on all played matches of the season, starting from the latest saved rating snapshot.
+    """
+    ratings, _ = update_ratings(season, factor, k_factor)
+    return ratings
 
-expected_return, home_pick, should_bet = pick_team(rating[home_name], rating[away_name], odds_home, odds_visitor, FLOOR, WIN_RATE_FLOOR, FACTOR)
 
-if should_bet:
-    if home_pick:
-        print(f"You should bet on {home_name}, for an expected return of: {expected_return}")
-    if not home_pick:
-        print(f"You should bet on {away_name}, for an expected return of: {expected_return}")
-else:
-    print("You should not bet as the expected return is too low. ")
+def predict(ratings, home, away, odds_home, odds_visitor):
+    """
+    Recommend a bet for one matchup, as a dict that can be sent back as JSON.
+    Bets like create_elo.main: only if the win probability passes WIN_RATE_FLOOR and FLOOR < expected return < CEIL.
+    """
+    expected_return, home_pick, flag_bet = pick_team(
+        ratings[home], ratings[away], odds_home, odds_visitor, FLOOR, WIN_RATE_FLOOR, FACTOR
+    )
+    should_bet = FLOOR < expected_return < CEIL and flag_bet
+    return {
+        "home": home,
+        "away": away,
+        "pick": (home if home_pick else away) if should_bet else None,
+        "expected_return": expected_return,
+        "bet": bool(should_bet),
+    }
+
+
+def answer(ratings, request):
+    """
+    Answer one request: a single {"home", "away", "odds_home", "odds_visitor"} query or {"queries": [...]}.
+    Malformed requests get an {"error": ...} answer instead of raising.
+    """
+    if not isinstance(request, dict):
+        return {"error": "a request must be a JSON object"}
+    if "queries" in request:
+        if not isinstance(request["queries"], list):
+            return {"error": "queries must be a list"}
+        return {"results": [answer(ratings, query) for query in request["queries"]]}
+    for field in ("odds_home", "odds_visitor"):
+        if field in request and (isinstance(request[field], bool) or not isinstance(request[field], (int, float))
+                                 or not math.isfinite(request[field])):
+            return {"error": f"{field} must be a finite number"}
+    try:
+        return predict(ratings, request["home"], request["away"], request["odds_home"], request["odds_visitor"])
+    except KeyError as error:
+        return {"error": f"unknown team or missing field {error}"}
+    except TypeError:
+        return {"error": "home and away must be team names"}
+
+
+def pick_teams(ratings_home, ratings_visitor, odds_home, odds_visitor, floor, win_rate_floor, ceil, factor):
+    """
+    pick_team for whole arrays of fixtures at once, betting like create_elo.main: only if the win probability
+    passes win_rate_floor and floor < expected return < ceil. Returns the arrays of expected returns, home picks,
+    bet flags and home win probabilities. The exponentials use math.exp, so for numeric odds every fixture agrees
+    with pick_team exactly. Missing (null or NaN) odds give a NaN expected return and are never bet on.
+    """
+    # numpy is only needed for slates, so one-off predictions start without it
+    import numpy as np
+
+    exp_home = np.array([math.exp(rating / factor) for rating in ratings_home])
+    exp_visitor = np.array([math.exp(rating / factor) for rating in ratings_visitor])
+    expected_home = exp_home / (exp_home + exp_visitor)
+    expected_visitor = exp_visitor / (exp_home + exp_visitor)
+    return_home = expected_home * np.asarray(odds_home, dtype=float) - 1
+    return_visitor = expected_visitor * np.asarray(odds_visitor, dtype=float) - 1
+
+    home_pick = return_home > return_visitor
+    # Like max(return_home, return_visitor) in pick_team, which keeps the first value unless the second is larger
+    expected_return = np.where(return_visitor > return_home, return_visitor, return_home)
+    should_bet = (
+        (np.where(home_pick, expected_home, expected_visitor) > win_rate_floor)
+        & (floor < expected_return) & (expected_return < ceil)
+    )
+    return expected_return, home_pick, should_bet, expected_home
+
+
+def predict_slate(ratings, fixtures):
+    """
+    Recommend bets for a list of fixtures in the scrapers' JSON format (Date, Time, Home Team, Away Team,
+    Home Odds, Away Odds), ranked with the bets first and the highest expected return first.
+    Fixtures with a team that has no rating are skipped, fixtures without odds get a null expected return.
+    """
+    fixtures = [fixture for fixture in fixtures if fixture["Home Team"] in ratings and fixture["Away Team"] in ratings]
+    expected_return, home_pick, should_bet, expected_home = pick_teams(
+        [ratings[fixture["Home Team"]] for fixture in fixtures],
+        [ratings[fixture["Away Team"]] for fixture in fixtures],
+        [fixture["Home Odds"] for fixture in fixtures],
+        [fixture["Away Odds"] for fixture in fixtures],
+        FLOOR, WIN_RATE_FLOOR, CEIL, FACTOR,
+    )
+
+    recommendations = []
+    for fixture, fixture_return, fixture_home_pick, fixture_bet, fixture_expected_home in zip(
+        fixtures, expected_return.tolist(), home_pick.tolist(), should_bet.tolist(), expected_home.tolist()
+    ):
+        home, away = fixture["Home Team"], fixture["Away Team"]
+        recommendations.append({
+            "date": fixture["Date"],
+            "time": fixture.get("Time"),
+            "home": home,
+            "away": away,
+            "odds_home": fixture["Home Odds"],
+            "odds_visitor": fixture["Away Odds"],
+            "win_prob_home": fixture_expected_home,
+            "pick": (home if fixture_home_pick else away) if fixture_bet else None,
+            "expected_return": fixture_return if math.isfinite(fixture_return) else None,
+            "bet": fixture_bet,
+        })
+    recommendations.sort(key=lambda recommendation: (
+        not recommendation["bet"],
+        recommendation["expected_return"] is None,
+        -(recommendation["expected_return"] or 0),
+    ))
+    return recommendations
+
+
+def latency_report(latencies):
+    """
+    Percentiles of the request latencies in milliseconds.
+    """
+    if not latencies:
+        return {"requests": 0}
+    ordered = sorted(latencies)
+    percentile = lambda q: ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] * 1000
+    return {
+        "requests": len(ordered),
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def serve(ratings, input_stream=sys.stdin, output_stream=sys.stdout):
+    """
+    Answer JSON requests, one per line, until the input closes. Ratings are only loaded once, by the caller.
+    A {"stats": true} request returns the latency percentiles so far, which are also printed to stderr at the end.
+    """
+    latencies = []
+    for line in input_stream:
+        if not line.strip():
+            continue
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as error:
+            response = {"error": f"invalid JSON: {error}"}
+        else:
+            try:
+                stats = isinstance(request, dict) and request.get("stats")
+                response = latency_report(latencies) if stats else answer(ratings, request)
+            except Exception as error:
+                # One bad request must not stop the service for the requests after it
+                response = {"error": f"{type(error).__name__}: {error}"}
+        output_stream.write(json.dumps(response) + "\n")
+        output_stream.flush()
+        latencies.append(time.perf_counter() - start)
+    print(json.dumps(latency_report(latencies)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recommend bets from the current season's ELO ratings.")
+    parser.add_argument("--serve", action="store_true", help="answer JSON requests on stdin until it closes")
+    parser.add_argument("--season", default=season, help="season to rate the teams on")
+    parser.add_argument("--as-of", help="use the ratings as they were on this date (YYYY-MM-DD)")
+    parser.add_argument("--slate", help="JSON file of fixtures with odds, in the scrapers' format, to recommend bets for")
+    parser.add_argument("--after", help="only recommend slate fixtures on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--output", default="recommendations.json", help="file to write the slate recommendations to")
+    args = parser.parse_args()
+
+    if args.as_of:
+        from rating_history import season_history
+
+        rating = season_history(args.season, FACTOR, K).ratings_at(args.as_of)
+    else:
+        rating = load_ratings(args.season)
+
+    if args.serve:
+        serve(rating)
+    elif args.slate:
+        with open(args.slate, "r", encoding="utf-8") as file:
+            slate = json.load(file)
+        if args.after:
+            slate = [fixture for fixture in slate if fixture["Date"] >= args.after]
+        recommendations = predict_slate(rating, slate)
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(recommendations, file, ensure_ascii=False, indent=4)
+        bets = sum(recommendation["bet"] for recommendation in recommendations)
+        print(f"{bets} bets out of {len(recommendations)} fixtures written to {args.output}")
+    else:
+        prediction = predict(rating, home_name, away_name, odds_home, odds_visitor)
+
+        if prediction["bet"]:
+            print(f"You should bet on {prediction['pick']}, for an expected return of: {prediction['expected_return']}")
+        else:
+            print("You should not bet as the expected return is too low. ")
@@ -0,0 +1,113 @@
+import json
+import os
+import sys
+import numpy as np
+from elo_core import DEFAULT_RATING, FACTOR, K, process_matches, read_matches
+from rating_store import parameter_key
+
+# Histories are saved to Database/{season}/history/{parameter key}/ as .npy arrays plus a JSON index
+HISTORY_DIR = "Database/{season}/history/{key}"
+
+
+class RatingHistory:
+    """
+    Rating of every team after each of its games, with the game date. Entries are grouped by team and sorted by
+    date within a team, so `rating_at` is a binary search over one team's slice of the arrays.
+    """
+
+    def __init__(self, teams, offsets, dates, ratings, meta=None):
+        self.teams = list(teams)
+        self.team_ids = {team: i for i, team in enumerate(self.teams)}
+        self.offsets = offsets  # Team i's entries are dates[offsets[i]:offsets[i + 1]]
+        self.dates = dates
+        self.ratings = ratings
+        self.meta = meta or {}
+
+    @classmethod
+    def build(cls, matches, factor=FACTOR, k_factor=K, meta=None):
+        """
+        Rate the matches with process_matches and attach each team's game dates to its rating history.
+        `matches` has Date, Visitor, Home and Res columns, like a match dataframe or read_matches.
+        """
+        _, ratings_history = process_matches(matches, factor, k_factor)
+        game_dates = {team: [] for team in ratings_history}
+        for date, visitor, home in zip(matches["Date"], matches["Visitor"], matches["Home"]):
+            game_dates[visitor].append(date)
+            game_dates[home].append(date)
+
+        teams = list(ratings_history)
+        offsets = np.zeros(len(teams) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(game_dates[team]) for team in teams])
+        dates = np.array([date for team in teams for date in game_dates[team]], dtype="M8[D]")
+        # The first history entry is the starting rating, before any game
+        ratings = np.array([rating for team in teams for rating in ratings_history[team][1:]], dtype=float)
+        meta = dict(meta or {}, factor=factor, k_factor=k_factor)
+        return cls(teams, offsets, dates, ratings, meta)
+
+    def rating_at(self, team, date):
+        """
+        The team's rating after all its games up to and including `date`.
+        """
+        i = self.team_ids[team]
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        played = np.searchsorted(self.dates[start:stop], np.datetime64(date, "D"), side="right")
+        return float(self.ratings[start + played - 1]) if played else DEFAULT_RATING
+
+    def ratings_at(self, date):
+        """
+        Every team's rating as of `date`, as the dict process_matches would return for the games until then.
+        """
+        return {team: self.rating_at(team, date) for team in self.teams}
+
+    def team_history(self, team):
+        """
+        The dates and ratings after each of the team's games, as zero-copy array slices.
+        """
+        i = self.team_ids[team]
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return self.dates[start:stop], self.ratings[start:stop]
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "offsets.npy"), self.offsets)
+        np.save(os.path.join(directory, "dates.npy"), self.dates)
+        np.save(os.path.join(directory, "ratings.npy"), self.ratings)
+        with open(os.path.join(directory, "index.json"), "w", encoding="utf-8") as file:
+            json.dump({"teams": self.teams, "meta": self.meta}, file, indent=4)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """
+        Open a saved history. The arrays are memory-mapped, so only the pages that lookups touch are read.
+        """
+        with open(os.path.join(directory, "index.json"), "r", encoding="utf-8") as file:
+            index = json.load(file)
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode) for name in ("offsets", "dates", "ratings")]
+        return cls(index["teams"], *arrays, meta=index["meta"])
+
+
+def history_dir(season, factor, k_factor):
+    return HISTORY_DIR.format(season=season, key=parameter_key(factor, k_factor))
+
+
+def season_history(season, factor=FACTOR, k_factor=K):
+    """
+    Load the saved history of a season, building and saving it first if it is missing or the CSV has changed.
+    """
+    directory = history_dir(season, factor, k_factor)
+    stat = os.stat(f"Database/{season}/{season}.csv")
+    source = [stat.st_mtime_ns, stat.st_size]
+    if os.path.exists(os.path.join(directory, "index.json")):
+        history = RatingHistory.load(directory)
+        if history.meta.get("source") == source:
+            return history
+
+    history = RatingHistory.build(read_matches(season), factor, k_factor, {"season": season, "source": source})
+    history.save(directory)
+    return RatingHistory.load(directory)
+
+
+# Look up a rating at a date, e.g. `python rating_history.py 23-24 "Boston Bruins" 2024-01-01`
+if __name__ == "__main__":
+    season, team, date = sys.argv[1:4]
+    print(season_history(season).rating_at(team, date))
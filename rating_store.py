@@ -0,0 +1,148 @@
+import csv
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+from elo_core import DEFAULT_RATING, FACTOR, K, expected_win, match_result, update_elo
+
+# Snapshots are written to Database/{season}/ratings/{parameter key}/{version}.json
+SNAPSHOT_DIR = "Database/{season}/ratings/{key}"
+
+
+def parameter_key(factor, k_factor):
+    """
+    Short stable name for a (factor, K) pair, so snapshots of different parameters never mix.
+    """
+    return hashlib.sha1(json.dumps([factor, k_factor]).encode()).hexdigest()[:12]
+
+
+def snapshot_dir(season, factor, k_factor):
+    return SNAPSHOT_DIR.format(season=season, key=parameter_key(factor, k_factor))
+
+
+def latest_snapshot(season, factor=FACTOR, k_factor=K):
+    """
+    Load the newest rating snapshot for the season and parameters, or None if there is none.
+    """
+    paths = sorted(glob.glob(os.path.join(snapshot_dir(season, factor, k_factor), "*.json")))
+    if not paths:
+        return None
+    with open(paths[-1], "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def empty_snapshot(season, factor, k_factor):
+    return {
+        "version": 0,
+        "season": season,
+        "factor": factor,
+        "k_factor": k_factor,
+        "matches_processed": 0,
+        "csv_offset": 0,
+        "csv_hash": "",
+        "ratings": {},
+    }
+
+
+def write_snapshot(snapshot):
+    """
+    Write the snapshot as the next version, without touching older versions.
+    """
+    directory = snapshot_dir(snapshot["season"], snapshot["factor"], snapshot["k_factor"])
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{snapshot['version']:05d}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(snapshot, file, indent=4)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def read_new_lines(csv_path, snapshot):
+    """
+    Read the CSV lines added after the snapshot, or None if the processed part of the file was changed.
+    Returns the header, the new lines, the offset of each line's end and a SHA-256 of the file up to the new lines,
+    to be extended with them.
+    """
+    with open(csv_path, "rb") as file:
+        # Skip blank lines before the header, like pandas does
+        header = file.readline()
+        while header and not header.strip():
+            header = file.readline()
+        header = header.decode("utf-8")
+        offset = snapshot["csv_offset"] or file.tell()
+
+        # Everything up to the offset must hash as it did when it was processed, otherwise replay the season
+        file.seek(0)
+        digest = hashlib.sha256(file.read(offset))
+        if snapshot["csv_offset"] and digest.hexdigest() != snapshot.get("csv_hash"):
+            return None
+
+        lines, ends = [], []
+        for line in file:
+            offset += len(line)
+            lines.append(line.decode("utf-8"))
+            ends.append(offset)
+    return header, lines, ends, digest
+
+
+def update_ratings(season, factor=FACTOR, k_factor=K, write=True):
+    """
+    Bring the latest rating snapshot up to date with the season's results and return the ratings.
+    Only matches added since the snapshot go through update_elo, a new version is written if there were any.
+    The ratings are the same as process_matches gives on the whole season.
+    """
+    csv_path = f"Database/{season}/{season}.csv"
+    snapshot = latest_snapshot(season, factor, k_factor) or empty_snapshot(season, factor, k_factor)
+    new_lines = read_new_lines(csv_path, snapshot)
+    if new_lines is None:
+        snapshot = dict(empty_snapshot(season, factor, k_factor), version=snapshot["version"])
+        new_lines = read_new_lines(csv_path, snapshot)
+    header, lines, ends, digest = new_lines
+
+    columns = next(csv.reader([header]))
+    visitor_col, home_col = columns.index("Visitor"), columns.index("Home")
+    gv_col, gh_col = columns.index("Gv"), columns.index("Gh")
+
+    ratings = snapshot["ratings"]
+    processed = 0
+    for line, end in zip(lines, ends):
+        digest.update(line.encode("utf-8"))
+        if not line.strip():
+            continue
+        row = next(csv.reader(io.StringIO(line)))
+        # Games without a score are skipped like read_matches does. The snapshot only covers the file up to the last
+        # scored game, so scheduled games after it are picked up when their scores arrive, and a skipped game
+        # before it that gets a score later changes the processed part and replays the season.
+        if not row[gv_col] or not row[gh_col]:
+            continue
+        visitor, home = row[visitor_col], row[home_col]
+        result = match_result(int(row[gh_col]), int(row[gv_col]))
+
+        rating_visitor = ratings.setdefault(visitor, DEFAULT_RATING)
+        rating_home = ratings.setdefault(home, DEFAULT_RATING)
+        expected_visitor, expected_home = expected_win(rating_visitor, rating_home, factor)
+        ratings[visitor] = update_elo(rating_visitor, expected_visitor, 1 - result, k_factor)
+        ratings[home] = update_elo(rating_home, expected_home, result, k_factor)
+
+        snapshot["csv_offset"] = end
+        snapshot["csv_hash"] = digest.hexdigest()
+        snapshot["last_match"] = {"date": row[columns.index("Date")], "visitor": visitor, "home": home}
+        processed += 1
+
+    if processed:
+        snapshot["version"] += 1
+        snapshot["matches_processed"] += processed
+        if write:
+            write_snapshot(snapshot)
+    return ratings, processed
+
+
+# Update the snapshots of a season with new results, e.g. `python rating_store.py 24-25`
+if __name__ == "__main__":
+    for season in sys.argv[1:] or ["24-25"]:
+        ratings, processed = update_ratings(season)
+        snapshot = latest_snapshot(season)
+        version = snapshot["version"] if snapshot else 0
+        print(f"{season}: {processed} new matches, snapshot version {version}")
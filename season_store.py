@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+
+# Compiled seasons live in one file: magic, header length, JSON header, then one aligned block per column.
+# create_elo.load_season and the GA workers read it. predict_match does not: its ratings come from rating_store,
+# which follows the season CSV incrementally as results arrive, while the store is only rebuilt as a whole.
+STORE_PATH = "Database/seasons.bin"
+MAGIC = b"MPSTORE1"
+ALIGNMENT = 64
+
+COLUMNS = [
+    ("season", "u1"),
+    ("date", "M8[D]"),
+    ("visitor", "u2"),
+    ("home", "u2"),
+    ("gv", "u1"),
+    ("gh", "u1"),
+    ("res", "f8"),
+    ("home_odds", "f8"),  # NaN when the match has no scraped odds
+    ("draw_odds", "f8"),
+    ("away_odds", "f8"),
+]
+
+# Opened stores, keyed by path: (mtime, size), store
+_STORES = {}
+
+
+def source_paths(season):
+    """
+    Paths of the CSV results and JSON odds a season is compiled from.
+    """
+    return f"Database/{season}/{season}.csv", f"match_data_with_dates_{season}.json"
+
+
+def all_seasons():
+    """
+    Every season with a results CSV in the Database folder, in chronological order.
+    """
+    return sorted(
+        name for name in os.listdir("Database") if os.path.isfile(source_paths(name)[0])
+    )
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    with open(path, "rb") as file:
+        digest = hashlib.sha1(file.read()).hexdigest()
+    return [stat.st_mtime_ns, stat.st_size, digest]
+
+
+def compile_seasons(seasons, path=STORE_PATH):
+    """
+    Compile the results and aligned odds of the given seasons into one memory-mappable columnar file.
+    Team names are interned to integer IDs shared by all seasons in the file. Like load_matches, only scored games
+    are compiled.
+    """
+    from create_elo import add_game_odds, load_matches, load_odds
+
+    teams, team_ids = [], {}
+    columns = {name: [] for name, _ in COLUMNS}
+    ranges, sources = {}, {}
+    start = 0
+    for season_id, season in enumerate(seasons):
+        df = load_matches(season)
+        df = add_game_odds(df, season, load_odds(season))
+        for team in list(df["Visitor"]) + list(df["Home"]):
+            if team not in team_ids:
+                team_ids[team] = len(teams)
+                teams.append(team)
+
+        columns["season"].append(np.full(len(df), season_id))
+        columns["date"].append(df["Date"].to_numpy(dtype="M8[D]"))
+        columns["visitor"].append([team_ids[team] for team in df["Visitor"]])
+        columns["home"].append([team_ids[team] for team in df["Home"]])
+        columns["gv"].append(df["Gv"].to_numpy())
+        columns["gh"].append(df["Gh"].to_numpy())
+        columns["res"].append(df["Res"].to_numpy(dtype=float))
+        columns["home_odds"].append(df["HomeOdds"].to_numpy(dtype=float))
+        columns["draw_odds"].append(df["DrawOdds"].to_numpy(dtype=float))
+        columns["away_odds"].append(df["AwayOdds"].to_numpy(dtype=float))
+
+        ranges[season] = [start, start + len(df)]
+        sources[season] = [_fingerprint(source) for source in source_paths(season)]
+        start += len(df)
+
+    arrays = [np.concatenate(columns[name]).astype(dtype) for name, dtype in COLUMNS]
+    header = {"rows": start, "teams": teams, "seasons": ranges, "sources": sources, "columns": []}
+
+    # Column offsets depend on the header length, so lay the columns out relative to the data start first
+    offset = 0
+    for (name, dtype), array in zip(COLUMNS, arrays):
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        header["columns"].append({"name": name, "dtype": dtype, "offset": offset})
+        offset += array.nbytes
+    header_bytes = json.dumps(header).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(len(header_bytes).to_bytes(8, "little"))
+        file.write(header_bytes)
+        for column, array in zip(header["columns"], arrays):
+            file.seek(data_start + column["offset"])
+            file.write(array.tobytes())
+    os.replace(tmp_path, path)
+    return header
+
+
+class SeasonStore:
+    """
+    Read-only view of a compiled season file. Columns are memory-mapped, nothing is parsed until used.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a compiled season store")
+            header_length = int.from_bytes(file.read(8), "little")
+            header = json.loads(file.read(header_length))
+        data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+
+        self.path = path
+        self.teams = header["teams"]
+        self.seasons = {season: tuple(rows) for season, rows in header["seasons"].items()}
+        self.sources = header["sources"]
+        self.columns = {}
+        for column in header["columns"]:
+            self.columns[column["name"]] = np.memmap(
+                path, dtype=column["dtype"], mode="r", offset=data_start + column["offset"], shape=(header["rows"],)
+            )
+        self._fresh = {}
+        self._frames = {}
+
+    def is_fresh(self, season):
+        """
+        Whether the season is in the store and its source files are unchanged since it was compiled.
+        """
+        if season not in self.seasons:
+            return False
+        try:
+            stats = [os.stat(source) for source in source_paths(season)]
+        except FileNotFoundError:
+            return False
+        signature = [(stat.st_mtime_ns, stat.st_size) for stat in stats]
+        cached = self._fresh.get(season)
+        if cached is None or cached[0] != signature:
+            # Only hash the sources when their mtime or size differs from the compiled ones
+            fresh = all(
+                (mtime, size) == current or _fingerprint(source)[2] == digest
+                for source, (mtime, size, digest), current in zip(source_paths(season), self.sources[season], signature)
+            )
+            cached = (signature, fresh)
+            self._fresh[season] = cached
+        return cached[1]
+
+    def arrays(self, season):
+        """
+        The columns of one season as zero-copy slices of the memory-mapped file.
+        """
+        start, stop = self.seasons[season]
+        return {name: column[start:stop] for name, column in self.columns.items()}
+
+    def frames(self, season):
+        """
+        The season as the (matches, odds) dataframes load_season returns, built once per store.
+        """
+        if season not in self._frames:
+            import pandas as pd
+
+            arrays = self.arrays(season)
+            teams = np.array(self.teams, dtype=object)
+            matches = pd.DataFrame({
+                "Date": np.datetime_as_string(arrays["date"], unit="D").astype(object),
+                "Visitor": teams[arrays["visitor"]],
+                "Gv": arrays["gv"].astype(int),
+                "Home": teams[arrays["home"]],
+                "Gh": arrays["gh"].astype(int),
+                "Res": np.array(arrays["res"]),
+            })
+            has_odds = ~np.isnan(arrays["home_odds"])
+            odds = pd.DataFrame({
+                "Date": pd.to_datetime(arrays["date"][has_odds]),
+                "Home Team": teams[arrays["home"][has_odds]],
+                "Away Team": teams[arrays["visitor"][has_odds]],
+                "Home Odds": arrays["home_odds"][has_odds],
+                "Draw Odds": arrays["draw_odds"][has_odds],
+                "Away Odds": arrays["away_odds"][has_odds],
+            })
+            self._frames[season] = (matches, odds)
+        return self._frames[season]
+
+
+def open_store(path=STORE_PATH):
+    """
+    Open the compiled season store, or return None if it has not been built.
+    The store is reopened only when the file changes.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _STORES.get(path)
+    if cached is None or cached[0] != signature:
+        cached = (signature, SeasonStore(path))
+        _STORES[path] = cached
+    return cached[1]
+
+
+# Compile seasons from the command line, e.g. `python season_store.py all` or `python season_store.py 23-24 24-25`
+if __name__ == "__main__":
+    seasons = sys.argv[1:]
+    if not seasons or seasons == ["all"]:
+        seasons = all_seasons()
+    header = compile_seasons(seasons)
+    print(f"Compiled {header['rows']} matches from {', '.join(seasons)} into {STORE_PATH}")
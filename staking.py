@@ -0,0 +1,80 @@
+import sys
+
+# Staking policies decide how much of the balance to put on a bet that passed the thresholds. A policy is any
+# function policy(balance, expected_return, win_prob, odds) -> stake. Stakes are clipped to [0, balance].
+STARTING_BALANCE = 100
+FLAT_STAKE = 5
+KELLY_FRACTION = 0.5
+CONFIDENCE_STAKE = 0.05
+
+
+def return_stake(balance, expected_return, win_prob, odds):
+    """
+    The stake create_elo.main uses: a twentieth of the balance per unit of expected return.
+    """
+    return balance * expected_return / 20
+
+
+def flat_stake(stake=FLAT_STAKE):
+    """
+    The same amount on every bet, whatever the balance.
+    """
+    def policy(balance, expected_return, win_prob, odds):
+        return stake
+    return policy
+
+
+def kelly_stake(fraction=KELLY_FRACTION):
+    """
+    A fraction of the Kelly criterion stake, edge / (odds - 1) of the balance, where the edge is the expected return.
+    """
+    def policy(balance, expected_return, win_prob, odds):
+        return balance * fraction * expected_return / (odds - 1)
+    return policy
+
+
+def confidence_stake(stake=CONFIDENCE_STAKE):
+    """
+    `stake` of the balance at even chances, growing with the win probability of the backed team.
+    """
+    def policy(balance, expected_return, win_prob, odds):
+        return balance * stake * win_prob / 0.5
+    return policy
+
+
+POLICIES = {
+    "return": return_stake,
+    "flat": flat_stake(),
+    "kelly": kelly_stake(1.0),
+    "half_kelly": kelly_stake(),
+    "confidence": confidence_stake(),
+}
+
+
+def simulate_policies(bets, policies=POLICIES):
+    """
+    Run every policy over the same bets in one pass, each with its own balance.
+    `bets` yields (expected_return, win_prob, won, odds) for the matches that passed the thresholds, in order.
+    With return_stake the balance equals create_elo.simulate_table.
+    Returns the final balance of each policy, keyed like `policies`.
+    """
+    names, stakes = list(policies), list(policies.values())
+    balances = [STARTING_BALANCE] * len(stakes)
+    for expected_return, win_prob, won, odds in bets:
+        for i, policy in enumerate(stakes):
+            balance = balances[i]
+            bet = min(max(policy(balance, expected_return, win_prob, odds), 0), balance)
+            balance -= bet
+            if won:
+                balance += odds * bet
+            balances[i] = balance
+    return dict(zip(names, balances))
+
+
+# Compare the policies on the default parameters, e.g. `python staking.py 22-23 23-24`
+if __name__ == "__main__":
+    from create_elo import FACTOR, K, FLOOR, WIN_RATE_FLOOR, CEIL, main_policies
+
+    for season in sys.argv[1:] or ["19-20", "20-21", "21-22", "22-23", "23-24"]:
+        balances = main_policies(FACTOR, K, FLOOR, WIN_RATE_FLOOR, CEIL, season)
+        print(season, ", ".join(f"{name} {balance:.2f}" for name, balance in balances.items()))